@@ -0,0 +1,115 @@
+from collections import Counter, defaultdict
+
+# Materialized tables: name -> dimensions of a row (stored as stat_<dimension>)
+TABLES = {
+    'questions': ['ministry', 'party', 'term', 'state'],
+    'laws': ['commission', 'type'],
+    'tenure': ['terms', 'party'],
+}
+
+
+def term_source(source, term):
+    """
+    Source of the question rows of a term: the questions files mix the terms,
+    and their rows are kept per term so that one term can be reloaded alone.
+
+    :param source: Source file
+    :param term: Term of the questions (None before the first known term)
+    :return: Source of the rows
+    """
+    return '%s#%s' % (source, term) if term else source
+
+
+class Analytics:
+    """
+    Aggregate tables computed while loading, stored as Stat nodes.
+
+    Rows are kept per source file (and per term for the questions, see
+    term_source), so that reloading a changed file only replaces the rows
+    of that file.
+    """
+    def __init__(self):
+        # (table, source) -> Counter of dimension tuples
+        self.rows = defaultdict(Counter)
+
+    def add_question(self, source, question):
+        """
+        Count a loaded question.
+
+        :param source: Source file of the question
+        :param question: Question object, with its author
+        """
+        self.rows['questions', term_source(source, question.term)][
+            (question.ministry.name, question.author.party, question.term, question.state)] += 1
+
+    def add_law(self, source, law):
+        """
+        Count a loaded law.
+
+        :param source: Source file of the law
+        :param law: Law object, with its commission
+        """
+        self.rows['laws', source][(law.commission.name, law.law_type)] += 1
+
+    def store(self, pol_manager, table, source):
+        """
+        Replace the rows of a table coming from a source file.
+
+        :param pol_manager: DgraphPoliticalSystemManager storing the Stat nodes
+        :param table: Name of the table
+        :param source: Source file
+        """
+        rows = self.rows.pop((table, source), Counter())
+        pol_manager.replace_stats(table, source, [
+            dict(zip(TABLES[table], dims), count=count) for dims, count in rows.items()
+        ])
+
+    def store_tenure(self, pol_manager):
+        """
+        Recompute the number of deputies per number of terms served and party.
+
+        :param pol_manager: DgraphPoliticalSystemManager to read the deputies from
+        """
+        tenure = Counter()
+        for deputy in pol_manager.query_tenures():
+            tenure[(deputy.get('terms', 0), deputy.get('party'))] += 1
+        pol_manager.replace_stats('tenure', 'database', [
+            {'terms': terms, 'party': party, 'count': count} for (terms, party), count in tenure.items()
+        ])
+
+
+def stats(pol_manager, table, group_by=None, **filters):
+    """
+    Read a materialized table, summed over its source files.
+
+    :param pol_manager: DgraphPoliticalSystemManager
+    :param table: Name of the table ('questions', 'laws' or 'tenure')
+    :param group_by: Dimensions to group by (all the dimensions of the table if None)
+    :param filters: Values of dimensions to select, e.g. ministry="العدل"
+    :return: Dictionary dimension tuple -> count
+    """
+    group_by = group_by or TABLES[table]
+    totals = Counter()
+    for row in pol_manager.query_stats(table, filters):
+        totals[tuple(row.get('stat_' + dim) for dim in group_by)] += row['stat_count']
+    return dict(totals)
+
+
+def questions_per_ministry(pol_manager, **filters):
+    """Number of questions to each ministry, e.g. questions_per_ministry(pm, term='2021_2026')."""
+    return {dims[0]: count for dims, count in stats(pol_manager, 'questions', ['ministry'], **filters).items()}
+
+
+def questions_per_party(pol_manager, **filters):
+    """Number of questions asked by the deputies of each party."""
+    return {dims[0]: count for dims, count in stats(pol_manager, 'questions', ['party'], **filters).items()}
+
+
+def laws_per_commission(pol_manager, **filters):
+    """Number of laws developed by each commission."""
+    return {dims[0]: count for dims, count in stats(pol_manager, 'laws', ['commission'], **filters).items()}
+
+
+def deputies_per_tenure(pol_manager, **filters):
+    """Number of deputies per number of terms served."""
+    return {dims[0]: count for dims, count in stats(pol_manager, 'tenure', ['terms'], **filters).items()}
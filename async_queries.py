@@ -0,0 +1,105 @@
+import asyncio
+
+# Maximum number of names packed in a single request
+DEFAULT_MAX_BATCH = 100
+# Time (in seconds) a lookup waits for others to join its request
+DEFAULT_BATCH_DELAY = 0.002
+
+
+class AsyncQueryBatcher:
+    """
+    Asynchronous lookups of representatives, coalesced into batched requests.
+
+    The lookups made during a short window (or until a batch is full) are
+    sent as a single request with one query block per name, through
+    DgraphPoliticalSystemManager.query_representatives, in a worker thread so
+    that the event loop is not blocked. Identical lookups in flight share the
+    same request and result.
+
+        batcher = AsyncQueryBatcher(pol_manager)
+        profiles = await batcher.representatives(names, 'Deputy')
+    """
+    def __init__(self, pol_manager, max_batch=DEFAULT_MAX_BATCH, delay=DEFAULT_BATCH_DELAY):
+        """
+        Initialize a batcher.
+
+        :param pol_manager: DgraphPoliticalSystemManager running the queries
+        :param max_batch: Maximum number of names per request
+        :param delay: Time a lookup waits for others before its request is sent
+        """
+        self.pol_manager = pol_manager
+        self.max_batch = max_batch
+        self.delay = delay
+        # rep_type -> {name: future} of the lookups waiting for a request
+        self.pending = {}
+        # (name, rep_type) -> future of the lookups waiting or in flight
+        self.in_flight = {}
+        self.timers = {}
+        # References to the requests being sent, so that they are not garbage collected
+        self.tasks = set()
+        self.requests = 0
+        self.coalesced = 0
+
+    async def representative(self, name, rep_type=None):
+        """
+        Look a representative up by name.
+
+        :param name: Name of the representative
+        :param rep_type: Type of representative (Deputy or Minister)
+        :return: List of matching representatives (shared, must not be modified)
+        """
+        future = self.in_flight.get((name, rep_type))
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.in_flight[name, rep_type] = future
+        batch = self.pending.setdefault(rep_type, {})
+        batch[name] = future
+        if len(batch) >= self.max_batch:
+            self._flush(rep_type)
+        elif rep_type not in self.timers:
+            self.timers[rep_type] = loop.call_later(self.delay, self._flush, rep_type)
+        return await asyncio.shield(future)
+
+    async def representatives(self, names, rep_type=None):
+        """
+        Look several representatives up by name.
+
+        :param names: Names of the representatives
+        :param rep_type: Type of representative (Deputy or Minister)
+        :return: Dictionary name -> list of matching representatives
+        """
+        names = list(dict.fromkeys(names))
+        results = await asyncio.gather(*(self.representative(name, rep_type) for name in names))
+        return dict(zip(names, results))
+
+    def _flush(self, rep_type):
+        """Send the pending lookups of a type as one request."""
+        timer = self.timers.pop(rep_type, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(rep_type, None)
+        if batch:
+            self.requests += 1
+            task = asyncio.ensure_future(self._send(batch, rep_type))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, batch, rep_type):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                None, self.pol_manager.query_representatives, list(batch), rep_type)
+        except Exception as e:
+            for name, future in batch.items():
+                self.in_flight.pop((name, rep_type), None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for name, future in batch.items():
+            self.in_flight.pop((name, rep_type), None)
+            if not future.done():
+                future.set_result(results.get(name, []))
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Ingest benchmark running the loaders of main.py against an in-process
+stand-in for pydgraph.DgraphClient, on synthetic corpora scaled from data/.
+
+    python3 benchmark.py --scales 1 10 100 --rtt 2 --commit-latency 5
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import re
+import resource
+import tempfile
+import threading
+import time
+
+# The progress bars of the loaders would drown the report
+os.environ.setdefault('TQDM_DISABLE', '1')
+
+import main
+from analytics import Analytics
+from check_data import DEPUTIES_PATH, LAWS_PATH, QUESTIONS_FILES, QUESTIONS_PATH, TERMS, iter_json_array, iter_json_object
+
+
+class FakeResponse:
+    """Response of the fake client (the fields of api.Response used by main.py)."""
+    def __init__(self, json_bytes=b'{}', uids=None):
+        self.json = json_bytes
+        self.uids = uids or {}
+
+
+class FakeTxn:
+    """Transaction of the fake client: records the requests and simulates their latency."""
+    def __init__(self, client, read_only=False, best_effort=False):
+        self.client = client
+        self.read_only = read_only
+        self.best_effort = best_effort
+
+    def query(self, query, variables=None, **kwargs):
+        self.client.round_trip('queries', len(query.encode('utf-8')) + len(json.dumps(variables or {})))
+        return FakeResponse(self.client.result(query, variables))
+
+    def mutate(self, mutation=None, set_obj=None, del_obj=None, set_nquads=None, del_nquads=None, cond=None, commit_now=None, **kwargs):
+        mutation = self.create_mutation(set_obj=set_obj, del_obj=del_obj, set_nquads=set_nquads, del_nquads=del_nquads, cond=cond)
+        return self.do_request(self.create_request(mutations=[mutation], commit_now=commit_now))
+
+    def create_mutation(self, mutation=None, set_obj=None, del_obj=None, set_nquads=None, del_nquads=None, cond=None):
+        return {'set_obj': set_obj, 'del_obj': del_obj, 'set_nquads': set_nquads, 'del_nquads': del_nquads, 'cond': cond}
+
+    def create_request(self, query=None, variables=None, mutations=None, commit_now=None, resp_format='JSON'):
+        return {'query': query, 'variables': variables, 'mutations': mutations or [], 'commit_now': commit_now}
+
+    def do_request(self, request, **kwargs):
+        size = len((request['query'] or '').encode('utf-8')) + len(json.dumps(request['variables'] or {}))
+        uids = {}
+        for mutation in request['mutations']:
+            for field in ['set_obj', 'del_obj']:
+                if mutation[field] is not None:
+                    # pydgraph serializes the payloads the same way
+                    size += len(json.dumps(mutation[field]).encode('utf-8'))
+                    self.client.assign_uids(mutation[field], uids)
+            for field in ['set_nquads', 'del_nquads']:
+                if mutation[field]:
+                    size += len(mutation[field].encode('utf-8'))
+        self.client.round_trip('mutations' if request['mutations'] else 'queries', size)
+        if request['commit_now']:
+            self.client.simulate_commit()
+        return FakeResponse(self.client.result(request['query'] or '', request['variables']), uids)
+
+    def commit(self):
+        self.client.round_trip('commits', 0)
+        self.client.simulate_commit()
+
+    def discard(self):
+        pass
+
+
+class FakeDgraphClient:
+    """
+    In-process stand-in for pydgraph.DgraphClient.
+
+    Blank nodes get fresh UIDs and the named nodes (deputies, commissions,
+    ministries) are kept, so that `type(...)` queries return them; other
+    queries return empty results. Every call sleeps for the configured latency.
+    """
+    def __init__(self, rtt=0.0, commit_latency=0.0):
+        """
+        Initialize the fake client.
+
+        :param rtt: Simulated round-trip time of each request, in seconds
+        :param commit_latency: Additional simulated latency of a commit, in seconds
+        """
+        self.rtt = rtt
+        self.commit_latency = commit_latency
+        self.uids = itertools.count(1)
+        self.nodes = {}
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(['round_trips', 'queries', 'mutations', 'commits', 'alters', 'bytes_sent'], 0)
+
+    def txn(self, read_only=False, best_effort=False, **kwargs):
+        return FakeTxn(self, read_only, best_effort)
+
+    def alter(self, operation):
+        self.round_trip('alters', operation.ByteSize())
+
+    def check_version(self, timeout=None):
+        return 'fake'
+
+    def round_trip(self, kind, size):
+        with self.lock:
+            self.counters['round_trips'] += 1
+            self.counters[kind] += 1
+            self.counters['bytes_sent'] += size
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def simulate_commit(self):
+        if self.commit_latency:
+            time.sleep(self.commit_latency)
+
+    def assign_uids(self, node, uids):
+        """Give a UID to every blank node of a mutation payload."""
+        if isinstance(node, list):
+            for item in node:
+                self.assign_uids(item, uids)
+        elif isinstance(node, dict):
+            uid = node.get('uid')
+            if isinstance(uid, str) and uid.startswith('_:'):
+                uid = uids.setdefault(uid[2:], hex(next(self.uids)))
+            elif not isinstance(uid, str) or uid.startswith('uid('):
+                uid = hex(next(self.uids))
+            if 'dgraph.type' in node and 'name' in node:
+                with self.lock:
+                    self.nodes.setdefault(node['dgraph.type'], {})[node['name']] = {
+                        'uid': uid, 'name': node['name'], 'party': node.get('party')}
+            for value in node.values():
+                self.assign_uids(value, uids)
+
+    def result(self, query, variables=None):
+        """
+        Result of a query: the kept nodes for a `type(...)` root, an empty list
+        for any other block.
+        """
+        result = {}
+        for block, root in re.findall(r'(\w+)\s*\(\s*func\s*:\s*([^)]*\)?)', query):
+            node_type = re.match(r'type\((\$?\w+)\)', root)
+            if node_type:
+                name = (variables or {}).get(node_type.group(1), node_type.group(1))
+                with self.lock:
+                    result[block] = list(self.nodes.get(name, {}).values())
+            else:
+                result[block] = []
+        return json.dumps(result).encode('utf-8')
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def suffixed(text, copy):
+    """Make a string unique for each copy of the corpus."""
+    return text if copy == 0 else '%s %d' % (text, copy)
+
+
+def write_json_array(file, records):
+    """Write records as a JSON array, one record per line."""
+    file.write('[\n')
+    for i, record in enumerate(records):
+        if i:
+            file.write(',\n')
+        file.write(json.dumps(record, ensure_ascii=False))
+    file.write('\n]\n')
+
+
+def generate_corpus(root, scale):
+    """
+    Write a synthetic corpus `scale` times the size of data/ under root/data,
+    each copy with its own deputies, laws and questions.
+
+    :param root: Directory receiving the corpus
+    :param scale: Number of copies of data/
+    """
+    os.makedirs(os.path.join(root, 'data'), exist_ok=True)
+
+    for term in TERMS:
+        with open(os.path.join(root, DEPUTIES_PATH % term), 'w') as file:
+            write_json_array(file, (dict(deputy, name=suffixed(deputy['name'], copy))
+                                    for copy in range(scale) for deputy in iter_json_array(DEPUTIES_PATH % term)))
+
+    with open(os.path.join(root, LAWS_PATH), 'w') as file:
+        file.write('{\n')
+        for i, law_type in enumerate(['projets_de_loi', 'propositions_de_loi', 'textes_de_loi']):
+            file.write('%s"%s": ' % (',\n' if i else '', law_type))
+            write_json_array(file, (dict(project, title=suffixed(project['title'], copy), url=suffixed(project['url'], copy))
+                                    for copy in range(scale)
+                                    for project_type, project in iter_json_object(LAWS_PATH) if project_type == law_type))
+        file.write('}\n')
+
+    for i in QUESTIONS_FILES:
+        with open(os.path.join(root, QUESTIONS_PATH % i), 'w') as file:
+            write_json_array(file, (dict(q, title=suffixed(q['title'], copy), author=suffixed(q['author'], copy))
+                                    for copy in range(scale) for q in iter_json_array(QUESTIONS_PATH % i)))
+
+
+def peak_rss():
+    """Peak resident set size of the process, in bytes (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Benchmark:
+    """
+    Records the cost of the loading phases of main.py, as the instrumentation
+    of the manager (see DgraphPoliticalSystemManager.phase).
+    """
+    def __init__(self, client):
+        self.client = client
+        self.phases = []
+        self.counters = {}
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Measure a phase; the body sets `result['records']`."""
+        result = {'phase': name, 'records': 0}
+        before = self.client.snapshot()
+        start = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - start
+        after = self.client.snapshot()
+        for counter in ['round_trips', 'bytes_sent']:
+            result[counter] = after[counter] - before[counter]
+        result['records_per_second'] = result['records'] / result['seconds'] if result['seconds'] else 0.0
+        result['peak_rss'] = peak_rss()
+        self.phases.append(result)
+
+
+def run(batch_size=main.DEFAULT_BATCH_SIZE, workers=1, rtt=0.0, commit_latency=0.0, incremental=False):
+    """
+    Load the corpus of the current directory through the fake client.
+
+    :return: List of phase results
+    """
+    client = FakeDgraphClient(rtt, commit_latency)
+    connection = main.DgraphConnection(client=client)
+    benchmark = Benchmark(client)
+
+    pol_manager = main.DgraphPoliticalSystemManager(connection, workers, instrumentation=benchmark)
+
+    with pol_manager.phase('setup'):
+        if not incremental:
+            connection.drop_all()
+        connection.set_schema()
+        pol_manager.deputies.load()
+        pol_manager.load_source_hashes()
+        pol_manager.load_entities()
+
+    # The phases of the load are measured by the manager
+    main.ingest(pol_manager, batch_size, incremental, Analytics())
+
+    connection.close()
+    return benchmark.phases
+
+
+def report(scale, phases):
+    print('\nscale %dx' % scale)
+    print('%-10s %9s %9s %12s %11s %13s %10s' % ('phase', 'records', 'seconds', 'records/s', 'round-trips', 'bytes sent', 'peak RSS'))
+    for p in phases:
+        print('%-10s %9d %9.3f %12.0f %11d %13d %8.1fMB' % (
+            p['phase'], p['records'], p['seconds'], p['records_per_second'],
+            p['round_trips'], p['bytes_sent'], p['peak_rss'] / 2 ** 20))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the loaders of main.py against a fake Dgraph client.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help='sizes of the synthetic corpora, as multiples of data/ (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=main.DEFAULT_BATCH_SIZE,
+                        help='number of nodes sent per mutation (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of batches sent concurrently (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='benchmark the upsert loader')
+    parser.add_argument('--rtt', type=float, default=0.0,
+                        help='simulated round-trip time of a request, in milliseconds (default: %(default)s)')
+    parser.add_argument('--commit-latency', type=float, default=0.0,
+                        help='simulated additional latency of a commit, in milliseconds (default: %(default)s)')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def benchmark_main(argv=None):
+    args = parse_args(argv)
+    results = []
+    cwd = os.getcwd()
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as root:
+            generate_corpus(root, scale)
+            os.chdir(root)
+            try:
+                phases = run(args.batch_size, args.workers, args.rtt / 1000, args.commit_latency / 1000, args.incremental)
+            finally:
+                os.chdir(cwd)
+        report(scale, phases)
+        results.append({'scale': scale, 'batch_size': args.batch_size, 'workers': args.workers,
+                        'incremental': args.incremental, 'rtt_ms': args.rtt,
+                        'commit_latency_ms': args.commit_latency, 'phases': phases})
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    benchmark_main()
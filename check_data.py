@@ -1,10 +1,123 @@
+import datetime
+import functools
 import json
 import re
+import sys
+from collections import Counter
 
 DEBUG = False
 
+# Opening of each term (ISO dates), to know the term of a dated record.
+# A new legislature only needs its entry here and its deputies file.
+TERM_STARTS = {'2011_2016': '2011-12-01', '2016_2021': '2016-10-01', '2021_2026': '2021-10-01'}
+
+# Scraped source files
+TERMS = list(TERM_STARTS)
+DEPUTIES_PATH = 'data/parliamentarians_arabic_%s.json'
+LAWS_PATH = 'data/laws_arabic_version.json'
+QUESTIONS_PATH = 'data/questions_%d.json'
+QUESTIONS_FILES = range(1,6)
+
+# Size of the chunks read by the streaming JSON reader
+CHUNK_SIZE = 1 << 16
+
+
+class JsonStream:
+    "Incremental reader of the JSON values of a file, one value at a time"
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        "Read the next chunk, dropping the part of the buffer already consumed"
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        "Next non blank character ('' at the end of the file)"
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        "Consume the next non blank character, which must be one of `chars`"
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("Expected %r at offset %d, got %r" % (chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        "Decode the next JSON value"
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number may continue in the next chunk
+            if (end == len(self.buffer) or self.buffer[end] in '0123456789.eE+-') and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def elements(self):
+        "Yield the elements of the array starting at the current position"
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_json_array(path):
+    "Stream the records of a file holding a JSON array (or JSON Lines with the .jsonl extension)"
+
+    with open(path, 'r') as file:
+        if path.endswith('.jsonl'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from JsonStream(file).elements()
+
+
+def iter_json_object(path):
+    "Stream the (key, record) pairs of a file holding a JSON object of arrays"
+
+    with open(path, 'r') as file:
+        stream = JsonStream(file)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            for record in stream.elements():
+                yield key, record
+            if stream.expect(',}') == '}':
+                return
+
+@functools.lru_cache(maxsize=None)
 def process_commission(word):
-    "Simple Stemmer for commissions"
+    "Simple Stemmer for commissions (memoized, the same strings come back in every file)"
     
     result = word.replace("لجنة","").replace("و ","و").replace("لإ","لا").strip()
     if "عدل" in word:
@@ -19,64 +132,234 @@ def process_commission(word):
     return result
 
 
-def extract_commissions_from_laws() :
-    with open('data/laws_arabic_version.json', 'r') as file:
-        data = json.load(file)
+def normalize_name(name):
+    "Key used to match deputy names (spaces and tatweel are not significant)"
+
+    return " ".join(name.replace("ـ","").split())
+
+
+# Folding of the Arabic letters whose variants are written interchangeably
+ARABIC_FOLDING = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ة': 'ه', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي'})
+ARABIC_DIACRITICS = re.compile('[ً-ْٰـ]')
+ARABIC_TOKEN = re.compile('[ء-ي0-9]+')
+ARABIC_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+ARABIC_SUFFIXES = ('ها', 'ان', 'ات', 'ون', 'ين', 'يه', 'ه', 'ي')
+ARABIC_STOPWORDS = frozenset(['في', 'من', 'علي', 'الي', 'عن', 'مع', 'او', 'ان', 'لا', 'ما', 'قد', 'كل', 'بين',
+                              'حول', 'بشان', 'الذي', 'التي', 'الذين', 'هذا', 'هذه', 'ذلك', 'تلك', 'بعد', 'قبل',
+                              'لدي', 'عند', 'اجل', 'و'])
+
+
+def normalize_arabic(text):
+    "Strip the diacritics and tatweel of an Arabic text and fold the alef/hamza/taa marbuta/alef maqsura variants"
+
+    return ARABIC_DIACRITICS.sub("", text).translate(ARABIC_FOLDING)
+
+
+def name_key(name):
+    "Key used to match the spelling variants of a person name (normalize_name plus Arabic letter folding)"
+
+    return normalize_arabic(normalize_name(name))
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def stem_arabic(word):
+    "Light stemmer: strip one article/conjunction prefix and one suffix of a normalized word"
+
+    if len(word) > 3 and word.startswith("و") and not word.startswith("وال"):
+        word = word[1:]
+    for prefix in ARABIC_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            word = word[len(prefix):]
+            break
+    for suffix in ARABIC_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            word = word[:-len(suffix)]
+            break
+    return word
+
+
+def title_terms(title):
+    "Distinct search terms of a title (normalized, stop words removed, stemmed), in order of appearance"
+
+    terms = []
+    for token in ARABIC_TOKEN.findall(normalize_arabic(title)):
+        if token in ARABIC_STOPWORDS:
+            continue
+        term = stem_arabic(token)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+# Month names of the dates of the laws (Moroccan and Middle-Eastern spellings), by normalized name
+ARABIC_MONTHS = {normalize_arabic(name): month for names, month in [
+    (['يناير', 'كانون الثاني'], 1), (['فبراير', 'شباط'], 2), (['مارس', 'آذار'], 3), (['أبريل', 'ابريل', 'نيسان'], 4),
+    (['ماي', 'مايو', 'أيار'], 5), (['يونيو', 'يونيه', 'حزيران'], 6), (['يوليوز', 'يوليو', 'يوليه', 'تموز'], 7),
+    (['غشت', 'أغسطس', 'آب'], 8), (['شتنبر', 'سبتمبر', 'أيلول'], 9), (['أكتوبر', 'تشرين الأول'], 10),
+    (['نونبر', 'نوفمبر', 'تشرين الثاني'], 11), (['دجنبر', 'ديسمبر', 'كانون الأول'], 12)
+] for name in names}
+
 
+def parse_arabic_date(text):
+    "ISO date (YYYY-MM-DD) of an Arabic date such as 'الأربعاء 17 يوليوز 2024', None when it cannot be parsed"
+
+    if not text:
+        return None
+    words = normalize_arabic(text).split()
+    day = month = year = None
+    for i, word in enumerate(words):
+        if word.isdigit():
+            if len(word) == 4:
+                year = int(word)
+            elif day is None:
+                day = int(word)
+        elif month is None:
+            # Two-word month names (e.g. 'كانون الثاني') come before single words
+            month = ARABIC_MONTHS.get(' '.join(words[i:i + 2])) or ARABIC_MONTHS.get(word)
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(date):
+    "Timezone-aware datetime of an ISO date or date-time (UTC when no offset is given), None for no date"
+
+    if not date:
+        return None
+    value = datetime.datetime.fromisoformat(date.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def term_of_date(date):
+    "Term during which an ISO date falls (None before the first known term)"
+
+    term = None
+    for t in TERMS:
+        if date[:10] >= TERM_STARTS[t]:
+            term = t
+    return term
+
+
+def normalize_deputy(deputy, term):
+    "Normalized deputy record, its commission is 'Nothing' for a group and None without function"
+
+    if 'function' not in deputy:
+        commission = None
+    elif "فريق" in deputy['function'] :
+        commission = 'Nothing'
+    else :
+        commission = process_commission(deputy['function'])
+    return {'name': deputy['name'], 'party': sys.intern(deputy['party']), 'term': sys.intern(term), 'commission': commission}
+
+
+def normalize_law(law_type, project):
+    "Normalized law record, None when no commission is known"
+
+    if law_type == 'textes_de_loi':
+        commission = project.get('commission')
+        date = project.get('date')
+        # The adopted texts start with their stage, e.g. "صادق عليه مجلس النواب - القراءة 1", which is
+        # kept out of the title so that a law keeps its key when it reaches the next stage
+        if '\n' in project['title']:
+            state, title = project['title'].split('\n', 1)
+            title = title.strip()
+        else:
+            state, title = None, project['title']
+    elif len(project['readings'])>0 :
+        commission = project['readings'][0].get('commission')
+        date = project['readings'][0].get('deposit_date')
+        # Last reading of the project
+        state = project['readings'][-1].get('reading')
+        title = project['title']
+    else :
+        commission = None
+    if commission is None:
+        return None
+    return {'title': title, 'type': sys.intern(law_type), 'link': project['url'],
+            'commission': process_commission(commission), 'date': parse_arabic_date(date),
+            'state': state and sys.intern(state.strip())}
+
+
+def normalize_question(q):
+    "Normalized question record"
+
+    # The ministries, authors, dates and states come back in many questions
+    term = term_of_date(q['date'])
+    return {'title': q['title'], 'ministry': sys.intern(q['to']), 'author': sys.intern(q['author']),
+            'date': sys.intern(q['date']), 'term': term and sys.intern(term), 'state': sys.intern(q['state'])}
+
+
+class Extraction:
+    "Single pass over the sources: yields the normalized records and collects the entities on the way"
+
+    def __init__(self):
+        self.commissions = Counter()
+        self.ministries = Counter()
+        self.parties = Counter()
+        self.authors = Counter()
+        # normalized name -> {'name', 'party', 'terms'}
+        self.deputies = {}
+
+    def read_deputies(self, term, path=None):
+        for deputy in iter_json_array(path or DEPUTIES_PATH%term):
+            record = normalize_deputy(deputy, term)
+            if record['commission'] is not None:
+                self.commissions[record['commission']] += 1
+            self.parties[record['party']] += 1
+            entry = self.deputies.setdefault(normalize_name(record['name']), {'name': record['name'], 'terms': []})
+            entry['party'] = record['party']
+            entry['terms'].append(term)
+            yield record
+
+    def read_laws(self, path=LAWS_PATH):
+        for law_type, project in iter_json_object(path):
+            if law_type == 'textes_de_loi':
+                readings = [project]
+            else:
+                readings = project['readings']
+            for reading in readings:
+                if 'commission' in reading:
+                    self.commissions[process_commission(reading['commission'])] += 1
+            record = normalize_law(law_type, project)
+            if record is not None:
+                yield record
+
+    def read_questions(self, i, path=None):
+        for q in iter_json_array(path or QUESTIONS_PATH%i):
+            record = normalize_question(q)
+            self.ministries[record['ministry']] += 1
+            self.authors[record['author']] += 1
+            yield record
+
+    def run(self, deputies=True, laws=True, questions=True, terms=None):
+        "Walk the selected sources (deputies of the selected terms) once, only collecting the entities"
+
+        for term in (terms or TERMS) if deputies else []:
+            for _ in self.read_deputies(term):
+                pass
+        if laws:
+            for _ in self.read_laws():
+                pass
+        for i in QUESTIONS_FILES if questions else []:
+            for _ in self.read_questions(i):
+                pass
+        return self
+
+
+def extract_commissions_from_laws() :
     # Extract the set of commissions without redundancy
-    commissions = set()
-    for project in data['projets_de_loi']:
-        for reading in project['readings']:
-            if 'commission' in reading:
-                commissions.add(process_commission(reading['commission']))
-
-    for project in data['propositions_de_loi']:
-        for reading in project['readings']:
-            if 'commission' in reading:
-                commissions.add(process_commission(reading['commission']))
-    for project in data['textes_de_loi']:
-            if 'commission' in project:
-                commissions.add(process_commission(project['commission']))
-
-    # Print the set of commissions
-    return commissions
-    for a in list(commissions):
-        print(a)
+    return set(Extraction().run(deputies=False, questions=False).commissions)
 
-def extract_commissions_from_deputies() :
-    
-    commissions = set()
-    for term in ['2011_2016','2016_2021','2021_2026'] :
-        with open('data/parliamentarians_arabic_%s.json'%term, 'r') as file:
-            data = json.load(file)
-
-        # Extract the set of commissions without redundancy
-        for deputy in data:
-            if 'function' in deputy:
-                if "فريق" in deputy['function'] :
-                    pass
-                else :
-                    commissions.add(process_commission(deputy['function']))
-
-        # Print the set of commissions
+def extract_commissions_from_deputies(terms=None) :
+    commissions = set(Extraction().run(laws=False, questions=False, terms=terms).commissions)
+    commissions.discard('Nothing')
     return commissions
-    for a in list(commissions):
-        print(a)
 
 def extract_ministry_from_questions() :
-    ministy = set()
-    for i in range(1,6):
-        with open('data/questions_%i.json'%i, 'r') as file:
-            data = json.load(file)
-
-        # Extract the set of commissions without redundancy
-        for q in data:
-            ministy.add(q['to'])
-
-    # Print the set of commissions
-    return ministy
-    for a in list(ministy):
-        print(a)
+    return set(Extraction().run(deputies=False, laws=False).ministries)
 
 #check_laws()
 #extract_commissions_from_laws()
@@ -88,23 +371,11 @@ def extract_ministry_from_questions() :
 
 def check_inter() : 
 
-    hq = set()
-    for i in range(1,6):
-        with open('data/questions_%d.json'%i, 'r') as file:
-            data_q = json.load(file)
-            for q in data_q:
-                hq.add(q['author'])
+    extraction = Extraction().run(laws=False)
+    hq = set(extraction.authors)
+    hd = set(d['name'] for d in extraction.deputies.values())
     #print("##",len(hq))
 
-    hd= set()
-
-    for term in ['2011_2016','2016_2021','2021_2026'] :
-        with open('data/parliamentarians_arabic_%s.json'%term, 'r') as file:
-            data_d = json.load(file)
-
-        for d in data_d:
-            hd.add(d['name'])
-    
     for a in list(set.intersection(hq,hd)):
         print(a)
     #print("##",len(hd))
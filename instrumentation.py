@@ -0,0 +1,216 @@
+import bisect
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+
+# Upper bounds (in milliseconds) of the buckets of the latency histograms
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+
+class LatencyHistogram:
+    """Histogram of the latencies of one kind of call."""
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """
+        Record one call.
+
+        :param seconds: Latency of the call
+        """
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'buckets_ms': {('<=%g' % bound if bound != float('inf') else '>%g' % LATENCY_BUCKETS[-2]): count
+                           for bound, count in zip(LATENCY_BUCKETS, self.counts) if count}
+        }
+
+
+class Instrumentation:
+    """
+    Records the phases of a load (wall time, calls and bytes sent during each
+    of them), the latency of every query/mutate/commit/alter call, and
+    counters such as aborted transactions and retries.
+    """
+    def __init__(self, profile_dir=None):
+        """
+        Initialize an empty instrumentation.
+
+        :param profile_dir: Optional directory receiving a cProfile dump (<phase>.prof) per phase
+        """
+        self.profile_dir = profile_dir
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.counters = {}
+        self.bytes_sent = 0
+        self.phases = []
+
+    def record_call(self, kind, seconds, size=0):
+        """
+        Record a call to Dgraph.
+
+        :param kind: Kind of call ('query', 'mutate', 'commit' or 'alter')
+        :param seconds: Latency of the call
+        :param size: Number of bytes sent
+        """
+        with self.lock:
+            self.latencies.setdefault(kind, LatencyHistogram()).add(seconds)
+            self.bytes_sent += size
+
+    def count(self, counter, n=1):
+        """
+        Increment a counter (e.g. 'retries', 'AbortedError').
+
+        :param counter: Name of the counter
+        :param n: Increment
+        """
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def _totals(self):
+        with self.lock:
+            return ({kind: (histogram.count, histogram.total) for kind, histogram in self.latencies.items()},
+                    self.bytes_sent)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Measure a phase of the load, profiling it when a profile directory is set.
+        The body can record its number of records in the dictionary it gets.
+
+        :param name: Name of the phase
+        """
+        phase = {'phase': name}
+        calls_before, bytes_before = self._totals()
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield phase
+        finally:
+            if profiler:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            calls_after, bytes_after = self._totals()
+
+            calls = {}
+            call_seconds = 0.0
+            for kind, (count, total) in calls_after.items():
+                count_before, total_before = calls_before.get(kind, (0, 0.0))
+                if count > count_before:
+                    calls[kind] = count - count_before
+                    call_seconds += total - total_before
+            phase.update({
+                'seconds': seconds,
+                'calls': calls,
+                'call_seconds': call_seconds,
+                'bytes_sent': bytes_after - bytes_before
+            })
+            if profiler:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                phase['profile'] = os.path.join(self.profile_dir, '%s.prof' % name)
+                profiler.dump_stats(phase['profile'])
+            with self.lock:
+                self.phases.append(phase)
+
+    def report(self):
+        """
+        Machine-readable report of the load.
+
+        :return: Dictionary with the phases, call latencies, bytes sent and counters
+        """
+        with self.lock:
+            return {
+                'phases': list(self.phases),
+                'calls': {kind: histogram.to_dict() for kind, histogram in self.latencies.items()},
+                'bytes_sent': self.bytes_sent,
+                'counters': dict(self.counters)
+            }
+
+    def write_report(self, path):
+        """
+        Write the report as JSON.
+
+        :param path: Path of the report
+        """
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+def request_size(request):
+    """Number of bytes of a request (a protobuf message, or the dictionaries of a fake client)."""
+    if hasattr(request, 'ByteSize'):
+        return request.ByteSize()
+    return len(json.dumps(request, default=str).encode('utf-8'))
+
+
+class InstrumentedTxn:
+    """Transaction wrapper timing each call and measuring the bytes it sends."""
+    def __init__(self, txn, instrumentation):
+        self.txn = txn
+        self.instrumentation = instrumentation
+
+    def _call(self, kind, size, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            self.instrumentation.count(type(e).__name__)
+            raise
+        finally:
+            self.instrumentation.record_call(kind, time.perf_counter() - start, size)
+
+    def query(self, query, variables=None, **kwargs):
+        size = len(query.encode('utf-8')) + len(json.dumps(variables or {}).encode('utf-8'))
+        return self._call('query', size, self.txn.query, query, variables=variables, **kwargs)
+
+    def mutate(self, mutation=None, set_obj=None, del_obj=None, set_nquads=None, del_nquads=None, cond=None, commit_now=None, **kwargs):
+        mutation = self.txn.create_mutation(mutation, set_obj, del_obj, set_nquads, del_nquads, cond)
+        request = self.txn.create_request(mutations=[mutation], commit_now=commit_now)
+        return self.do_request(request, **kwargs)
+
+    def do_request(self, request, **kwargs):
+        kind = 'mutate' if (request['mutations'] if isinstance(request, dict) else request.mutations) else 'query'
+        return self._call(kind, request_size(request), self.txn.do_request, request, **kwargs)
+
+    def commit(self, **kwargs):
+        return self._call('commit', 0, self.txn.commit, **kwargs)
+
+    def __getattr__(self, name):
+        # create_mutation, create_request, discard...
+        return getattr(self.txn, name)
+
+
+class InstrumentedClient:
+    """Client wrapper whose transactions and schema operations are instrumented."""
+    def __init__(self, client, instrumentation):
+        self.client = client
+        self.instrumentation = instrumentation
+
+    def txn(self, *args, **kwargs):
+        return InstrumentedTxn(self.client.txn(*args, **kwargs), self.instrumentation)
+
+    def alter(self, operation, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.client.alter(operation, **kwargs)
+        finally:
+            self.instrumentation.record_call('alter', time.perf_counter() - start, operation.ByteSize())
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
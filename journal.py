@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+
+# Default path of the checkpoint journal of the loads
+DEFAULT_JOURNAL = 'ingest_journal.jsonl'
+
+
+class SourceChangedError(Exception):
+    """A source changed since the interrupted load, which can then not be resumed."""
+
+
+class Journal:
+    """
+    Checkpoint journal of a load, written as JSON Lines and synced to disk
+    after every committed batch.
+
+    The objects of a load come in streams (the deputies, the laws file, each
+    questions file, the similar_to links), cut into numbered batches. For each
+    committed batch, the journal records its stream, batch id and the UIDs
+    assigned to its objects (the batches are numbered with the batch size of
+    the journal, hence the same ones when resuming). A resumed load skips the committed
+    batches of each stream and gets the UIDs of their objects back from the
+    journal, instead of sending them again.
+    """
+    def __init__(self, path=DEFAULT_JOURNAL):
+        """
+        Initialize a journal.
+
+        :param path: Path of the journal file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.batch_size = None
+        # stream -> content hash of its sources
+        self.hashes = {}
+        # stream -> set of committed batch ids
+        self.committed = {}
+        # object key -> UID
+        self.uids = {}
+
+    def exists(self):
+        """Whether a journal was left by an interrupted load."""
+        return os.path.exists(self.path)
+
+    def open(self, batch_size, resume=False):
+        """
+        Start a journal, or continue the one of an interrupted load.
+
+        :param batch_size: Number of objects per batch
+        :param resume: Replay the existing journal and append to it
+        :return: Batch size to use (the one of the interrupted load when resuming)
+        """
+        if resume and self.exists():
+            self._replay()
+            self.file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self.batch_size = batch_size
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self._write({'event': 'start', 'batch_size': batch_size})
+        return self.batch_size
+
+    def _replay(self):
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line cut by the interruption
+                    break
+                if entry['event'] == 'start':
+                    self.batch_size = entry['batch_size']
+                elif entry['event'] == 'stream':
+                    self.hashes[entry['stream']] = entry['hash']
+                elif entry['event'] == 'batch':
+                    self.committed.setdefault(entry['stream'], set()).add(entry['batch'])
+                    self.uids.update(entry['uids'])
+
+    def _write(self, entry):
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def begin_stream(self, stream, content_hash=None):
+        """
+        Record the start of a stream, checking that its sources did not change
+        since the interrupted load.
+
+        :param stream: Name of the stream
+        :param content_hash: Content hash of the sources of the stream
+        """
+        if stream in self.hashes:
+            if self.hashes[stream] != content_hash and self.committed.get(stream):
+                raise SourceChangedError('%s changed since the interrupted load, run a full load instead of resuming'
+                                         % stream)
+            return
+        self.hashes[stream] = content_hash
+        self._write({'event': 'stream', 'stream': stream, 'hash': content_hash})
+
+    def is_committed(self, stream, batch_id):
+        """Whether a batch of a stream was committed by the interrupted load."""
+        return batch_id in self.committed.get(stream, ())
+
+    def mark_committed(self, checkpoints):
+        """
+        Add the batches committed in the database but missing from the journal
+        (interrupted between the commit and the journal write).
+
+        :param checkpoints: Iterable of '<stream>#<batch id>' strings
+        """
+        for checkpoint in checkpoints:
+            stream, _, batch_id = checkpoint.rpartition('#')
+            self.committed.setdefault(stream, set()).add(int(batch_id))
+
+    def record_batch(self, stream, batch_id, uids):
+        """
+        Record a committed batch.
+
+        :param stream: Name of the stream
+        :param batch_id: Number of the batch in the stream
+        :param uids: Dictionary object key -> UID of the objects of the batch
+        """
+        with self.lock:
+            self.committed.setdefault(stream, set()).add(batch_id)
+        self._write({'event': 'batch', 'stream': stream, 'batch': batch_id, 'uids': uids})
+
+    def close(self, remove=False):
+        """
+        Close the journal.
+
+        :param remove: Delete the journal file (once the load completed)
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if remove and self.exists():
+            os.remove(self.path)
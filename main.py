@@ -1,38 +1,230 @@
 #!/usr/bin/env python3
+import argparse
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import gzip
+import hashlib
+import itertools
 import json
+import math
+import os
+import random
+import threading
+import time
 import pydgraph
 from enum import Enum, auto
 from tqdm import tqdm
 
-from check_data import extract_commissions_from_deputies, extract_commissions_from_laws, extract_ministry_from_questions, process_commission
+from analytics import Analytics, term_source
+from instrumentation import InstrumentedClient, Instrumentation
+from journal import DEFAULT_JOURNAL, Journal
+from mirror import DEFAULT_MIRROR, SqliteMirror, law_key
+from resolution import AuthorResolver
+from routing import DEFAULT_HEALTH_INTERVAL, POLICIES, ROUND_ROBIN, Endpoint, ReadRouter
+from similarity import SIMILARITY_THRESHOLD, SimilarLink, SimilarQuestions, bands, signature, similarity
+from check_data import DEPUTIES_PATH, LAWS_PATH, QUESTIONS_FILES, QUESTIONS_PATH, TERMS, Extraction, normalize_name, parse_date, title_terms
+
+# Number of nodes sent in a single mutation by the bulk loaders
+DEFAULT_BATCH_SIZE = 1000
+
+# Default size and time to live (in seconds) of the query cache
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60
+
+# Number of hits per page of the searches
+DEFAULT_PAGE_SIZE = 20
+
+# Number of LSH bands looked up per query when comparing a load with the stored questions
+BAND_LOOKUP_SIZE = 500
+
+# Number of nodes (or nested edges) fetched per page by the cursor_* methods
+DEFAULT_CURSOR_SIZE = 1000
+
+# Local index of the stored states, used by the states command
+DEFAULT_STATE_INDEX = 'state_index.json'
+
+# Fields returned for a representative by query_representative(s)
+REPRESENTATIVE_FIELDS = """{
+                uid
+                name
+                party
+                type
+                work_at{
+                    commission{
+                        uid
+                        name
+                    }
+                    term
+                }
+                ask{
+                    to{
+                        uid
+                        name
+                    }
+                    title
+                }
+            }"""
+
+# Retries of a batch whose transaction was aborted by a conflict, and the
+# base delay (in seconds) of the exponential backoff between them
+MAX_RETRIES = 5
+RETRY_DELAY = 0.1
+
+
+def batched(iterable, size):
+    """
+    Split an iterable into lists of at most `size` elements.
+
+    :param iterable: Iterable to split
+    :param size: Maximum size of a batch
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def hash_file(path):
+    """
+    Compute the content hash of a source file.
+
+    :param path: Path of the file
+    :return: Hexadecimal SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def to_datetime(value, end=False):
+    """
+    Timezone-aware datetime of a datetime, date or ISO string (UTC when no timezone is given).
+
+    :param value: Date or date-time
+    :param end: Whether the value ends a period: a date without time then stands for its last microsecond
+    :return: datetime
+    """
+    whole_day = isinstance(value, str) and len(value) == 10 or not isinstance(value, (str, datetime.datetime))
+    if isinstance(value, str):
+        value = parse_date(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    if end and whole_day:
+        value += datetime.timedelta(days=1, microseconds=-1)
+    return value
+
+
+def time_buckets(start, end, bucket='month'):
+    """
+    Split a period into calendar buckets.
+
+    :param start: Start of the period (aware datetime), included
+    :param end: End of the period, included
+    :param bucket: 'day', 'week', 'month', 'quarter' or 'year'
+    :return: Iterator of (start, end) of the buckets, both included
+    """
+    if bucket == 'day':
+        current = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif bucket == 'week':
+        current = start.replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=start.weekday())
+    elif bucket in ('month', 'quarter', 'year'):
+        month = {'month': start.month, 'quarter': start.month - (start.month - 1) % 3, 'year': 1}[bucket]
+        current = start.replace(month=month, day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError('Unknown bucket %r' % bucket)
+
+    while current <= end:
+        if bucket == 'day':
+            following = current + datetime.timedelta(days=1)
+        elif bucket == 'week':
+            following = current + datetime.timedelta(weeks=1)
+        else:
+            months = {'month': 1, 'quarter': 3, 'year': 12}[bucket]
+            month = current.month - 1 + months
+            following = current.replace(year=current.year + month // 12, month=month % 12 + 1)
+        yield max(current, start), min(following - datetime.timedelta(microseconds=1), end)
+        current = following
+
+
+def question_key(title, author, date):
+    """
+    Stable key identifying a question (title + author + date).
+
+    :return: Hexadecimal SHA-1 digest
+    """
+    return hashlib.sha1('\x1f'.join([title, normalize_name(author), date]).encode('utf-8')).hexdigest()
+
+
+def work_at_key(name, term):
+    """Stable key identifying the membership of a deputy during a term."""
+    return '%s|%s' % (normalize_name(name), term)
+
+
+def reference(entity, compact=True):
+    """
+    Serialize an entity referenced by another node.
+
+    In compact mode, an entity that already has a UID is emitted as a bare
+    {'uid': ...} reference instead of being embedded again.
+
+    :param entity: Commission or Ministry object
+    :param compact: Whether to use a bare reference when possible
+    :return: Dictionary for the Dgraph mutation
+    """
+    if compact and entity.uid:
+        return {'uid': entity.uid}
+    return entity.to_dict()
 
 class DgraphConnection:
     """Manages the connection to Dgraph database."""
-    def __init__(self, host='localhost', port='9080'):
-        """
-        Initialize Dgraph client connection.
-        
-        :param host: Dgraph server host
-        :param port: Dgraph server port
-        """
-        self.client_stub = pydgraph.DgraphClientStub(f'{host}:{port}')
-        self.client = pydgraph.DgraphClient(self.client_stub)
-
-    def drop_all(self):
-        """Drop all data in the database."""
-        return self.client.alter(pydgraph.Operation(drop_all=True))
 
-    def set_schema(self):
-        """Define schema for Political System."""
-        schema = """
-        name: string @index(exact) .
+    # Schema for Political System
+    SCHEMA = """
+        name: string @index(exact) @upsert .
         title: string @index(exact) .
+        # Normalized and stemmed words of the titles (see check_data.title_terms)
+        title_terms: [string] @index(exact) .
+        # LSH bands of the MinHash signature of the question titles (see similarity.py)
+        minhash_bands: [string] @index(exact) .
         type: string @index(exact) .
         state: string @index(exact) .
         party: string @index(exact) .
-        link: string .
-        created_at: datetime .
+        link: string @index(exact) @upsert .
+        key: string @index(exact) @upsert .
+        created_at: datetime @index(hour) .
+
+        # State transitions of the questions and laws (see sync_states)
+        state_history: [uid] .
+        from_state: string .
+        to_state: string @index(exact) .
+        changed_at: datetime @index(hour) .
+
+        # Batches committed by the load in progress (see journal.py)
+        checkpoint: string @index(exact) .
+
+        # Content hash of the loaded source files
+        source_file: string @index(exact) @upsert .
+        content_hash: string .
+
+        # Materialized analytics (see analytics.py)
+        stat: string @index(exact) .
+        stat_source: string @index(exact) .
+        stat_ministry: string @index(exact) .
+        stat_party: string @index(exact) .
+        stat_term: string @index(exact) .
+        stat_state: string @index(exact) .
+        stat_commission: string @index(exact) .
+        stat_type: string @index(exact) .
+        stat_terms: int @index(int) .
+        stat_count: int .
 
         # Add this line to define the minister predicate for Ministry
         minister: uid .
@@ -40,12 +232,16 @@ class DgraphConnection:
         deputy: [uid] .
         law: [uid] .
         question: [uid] .
-        commission: uid .
+        commission: uid @reverse .
         ministry: uid .
-        work_at: [uid] .
-        developed_by : uid .
-        ask : [uid] .
-        to : uid .
+        # Counted and reversed for the index-driven queries (laws_by_commission, deputies_in_term...)
+        work_at: [uid] @reverse @count .
+        # Term of the work_at nodes and questions: the partition key of the term-scoped loads
+        term: string @index(exact) .
+        developed_by : uid @reverse .
+        ask : [uid] @reverse @count .
+        to : uid @reverse .
+        similar_to : [uid] @reverse .
 
         type Deputy {
             name
@@ -70,27 +266,114 @@ class DgraphConnection:
 
         type Law {
             title
+            title_terms
             type
             link
+            key
+            state
+            state_history
             created_at
             developed_by
         }
 
         type Question {
             title
+            title_terms
+            minhash_bands
+            similar_to
             to
             created_at
             state
+            state_history
+            key
+            term
+        }
+
+        type StateChange {
+            from_state
+            to_state
+            changed_at
+        }
+
+        type Checkpoint {
+            checkpoint
+        }
+
+        type Source {
+            source_file
+            content_hash
         }
+
+        type Stat {
+            stat
+            stat_source
+            stat_ministry
+            stat_party
+            stat_term
+            stat_state
+            stat_commission
+            stat_type
+            stat_terms
+            stat_count
+        }
+        """
+
+    def __init__(self, host='localhost', port='9080', stubs=1, client=None, endpoints=None, policy=ROUND_ROBIN,
+                 health_interval=DEFAULT_HEALTH_INTERVAL):
         """
-        return self.client.alter(pydgraph.Operation(schema=schema))
+        Initialize Dgraph client connection.
+        
+        :param host: Dgraph server host
+        :param port: Dgraph server port
+        :param stubs: Number of gRPC stubs the requests are spread over, per Alpha
+        :param client: Optional client to use instead of connecting to the
+                       server (e.g. benchmark.FakeDgraphClient), or list of
+                       clients standing in for several Alphas
+        :param endpoints: Optional list of host:port of the Alphas, instead of host and port
+        :param policy: Routing of the read-only queries over the Alphas (see routing.py)
+        :param health_interval: Seconds between two health checks of the Alphas
+        """
+        if client is not None:
+            clients = client if isinstance(client, list) else [client]
+            router_endpoints = [Endpoint('client%d' % i, alpha) for i, alpha in enumerate(clients)]
+            self.client_stubs = []
+            self.client_stub = None
+            self.client = clients[0]
+        else:
+            router_endpoints = [Endpoint.connect(address, stubs) for address in endpoints or [f'{host}:{port}']]
+            self.client_stubs = [stub for endpoint in router_endpoints for stub in endpoint.stubs]
+            self.client_stub = self.client_stubs[0]
+            # Writes can go to any Alpha, which forwards them to the leader of their group
+            self.client = pydgraph.DgraphClient(*self.client_stubs)
+        # Reads are routed to a healthy Alpha
+        self.reads = ReadRouter(router_endpoints, policy, health_interval)
+
+    def instrument(self, instrumentation):
+        """
+        Time every call of the client and measure the bytes it sends.
+
+        :param instrumentation: Instrumentation recording the calls
+        """
+        self.client = InstrumentedClient(self.client, instrumentation)
+        for endpoint in self.reads.endpoints:
+            endpoint.client = InstrumentedClient(endpoint.client, instrumentation)
+
+    def drop_all(self):
+        """Drop all data in the database."""
+        return self.client.alter(pydgraph.Operation(drop_all=True))
+
+    def set_schema(self):
+        """Define schema for Political System."""
+        return self.client.alter(pydgraph.Operation(schema=self.SCHEMA))
     def close(self):
-        """Close the client stub connection."""
-        self.client_stub.close()
+        """Stop the health checks and close the client stub connections."""
+        self.reads.close()
 
 
 class Law:
     """Represents a law in the legislative system."""
+    __slots__ = ('uid', 'title', 'law_type', 'link', 'created_at', 'commission', 'state')
+
     def __init__(self, title, law_type, link=None):
         """
         Initialize a Law.
@@ -106,6 +389,7 @@ class Law:
         self.link = link
         self.created_at = datetime.datetime.now()
         self.commission = None
+        self.state = None
 
     def update_state(self, new_state):
         """
@@ -115,53 +399,31 @@ class Law:
         """
         self.state = new_state
 
-    def to_dict(self):
+    def to_dict(self, compact=True):
         """
         Convert Law object to a dictionary for Dgraph mutation.
         
+        :param compact: Reference an already persisted commission by its UID only
         :return: Dictionary representation of the Law
         """
         law_dict = {
             'dgraph.type': 'Law',
             'title': self.title,
+            'title_terms': title_terms(self.title),
             'type': self.law_type,
             'link': self.link,
-            'created_at': self.created_at.isoformat()
+            'key': law_key(self.law_type, self.link, self.title)
         }
-        
-        if self.commission:
-            #print(self.commission.to_dict())
-            law_dict['developed_by'] = self.commission.to_dict()
-        
-        if self.uid:
-            law_dict['uid'] = self.uid
-        
-        return law_dict
-        
-    def update_state(self, new_state):
-        """
-        Update the state of the law.
-        
-        :param new_state: New state for the law
-        """
-        self.state = new_state
 
-    def to_dict(self):
-        """
-        Convert Law object to a dictionary for Dgraph mutation.
-        
-        :return: Dictionary representation of the Law
-        """
-        law_dict = {
-            'dgraph.type': 'Law',
-            'title': self.title,
-            'link': self.link,
-            'created_at': self.created_at.isoformat()
-        }
+        if self.state:
+            law_dict['state'] = self.state
+
+        if self.created_at:
+            law_dict['created_at'] = self.created_at.isoformat()
         
         if self.commission:
             #print(self.commission.to_dict())
-            law_dict['developed_by'] = self.commission.to_dict()
+            law_dict['developed_by'] = reference(self.commission, compact)
         
         if self.uid:
             law_dict['uid'] = self.uid
@@ -170,6 +432,8 @@ class Law:
 
 class Question:
     """Represents a Question to a ministry asked by deputy"""
+    __slots__ = ('uid', 'title', 'ministry', 'state', 'created_at', 'author', 'key', 'term')
+
     def __init__(self, title, ministry, state):
         """
         """
@@ -178,20 +442,37 @@ class Question:
         self.ministry = ministry
         self.state = state
         self.created_at = datetime.datetime.now()
+        self.author = None
+        self.key = None
+        self.term = None
 
-    def to_dict(self):
+    def to_dict(self, compact=True):
         """
         Convert Q object to a dictionary for Dgraph mutation.
         
+        :param compact: Reference an already persisted ministry by its UID only
         :return: Dictionary representation of the Law
         """
         q_dict = {
             'dgraph.type': 'Question',
             'title': self.title,
+            'title_terms': title_terms(self.title),
             'state': self.state,
-            'created_at': self.created_at.isoformat(),
-            'to': self.ministry.to_dict()
+            'to': reference(self.ministry, compact)
         }
+
+        if self.created_at:
+            q_dict['created_at'] = self.created_at.isoformat()
+
+        if self.key:
+            q_dict['key'] = self.key
+
+        if self.term:
+            q_dict['term'] = self.term
+
+        sig = signature(self.title)
+        if sig is not None:
+            q_dict['minhash_bands'] = list(bands(sig))
         
         if self.uid:
             q_dict['uid'] = self.uid
@@ -206,6 +487,8 @@ class Question:
 
 class Commission:
     """Represents a legislative commission."""
+    __slots__ = ('uid', 'name')
+
     def __init__(self, name):
         """
         Initialize a Commission.
@@ -247,6 +530,8 @@ class Commission:
 
 class PoliticalRepresentative:
     """Base class for political representatives."""
+    __slots__ = ('uid', 'name', 'party')
+
     def __init__(self, name, party):
         """
         Initialize a political representative.
@@ -261,6 +546,8 @@ class PoliticalRepresentative:
 
 class Deputy(PoliticalRepresentative):
     """Represents a Deputy in the political system."""
+    __slots__ = ('commissions', 'terms')
+
     def __init__(self, name, party,uid = None):
         """
         Initialize a Deputy.
@@ -277,15 +564,17 @@ class Deputy(PoliticalRepresentative):
         """
         Add a commission to the deputy.
         
-        :param commission: Commission to add
+        :param commission: Commission to add (None when the source gives none for the term)
+        :param term: Term of the membership
         """
         self.commissions.append(commission)
         self.terms.append(term)
 
-    def to_dict(self):
+    def to_dict(self, compact=True):
         """
         Convert Deputy object to a dictionary for Dgraph mutation.
         
+        :param compact: Reference the already persisted commissions by their UID only
         :return: Dictionary representation of the Deputy
         """
 
@@ -293,10 +582,14 @@ class Deputy(PoliticalRepresentative):
                 'dgraph.type': 'Deputy',
                 'name': self.name,
                 'party': self.party,
-                'work_at' : [{ 'commission' : self.commissions[i].to_dict(),
-                                'term' :  self.terms[i] } for i in range(len(self.commissions))]
+                'work_at' : [{ 'term' :  self.terms[i],
+                                'key' : work_at_key(self.name, self.terms[i]) } for i in range(len(self.commissions))]
                 
             }
+        # One work_at node per term served, with the commission when known
+        for work_at, commission in zip(deputy_dict['work_at'], self.commissions):
+            if commission is not None:
+                work_at['commission'] = reference(commission, compact)
 
         #if len(self.commissions)>0 :
         #    commission = self.commissions[0]
@@ -311,6 +604,8 @@ class Deputy(PoliticalRepresentative):
 
 class Ministry:
     """Represents a ministry in the political system."""
+    __slots__ = ('uid', 'name', 'minister')
+
     def __init__(self, name):
         """
         Initialize a Ministry.
@@ -319,6 +614,7 @@ class Ministry:
         """
         self.uid = None
         self.name = name
+        self.minister = None
 
     def to_dict(self):
         """
@@ -340,6 +636,8 @@ class Ministry:
 
 class Minister(PoliticalRepresentative):
     """Represents a Minister in the political system."""
+    __slots__ = ('ministry',)
+
     def __init__(self, name, party, ministry):
         """
         Initialize a Minister.
@@ -352,17 +650,18 @@ class Minister(PoliticalRepresentative):
         self.ministry = ministry
         ministry.minister = self
 
-    def to_dict(self):
+    def to_dict(self, compact=True):
         """
         Convert Minister object to a dictionary for Dgraph mutation.
         
+        :param compact: Reference an already persisted ministry by its UID only
         :return: Dictionary representation of the Minister
         """
         minister_dict = {
             'dgraph.type': 'Minister',
             'name': self.name,
             'party': self.party,
-            'work_at':  self.ministry.to_dict()
+            'work_at':  reference(self.ministry, compact)
         }
         
         if self.uid:
@@ -371,15 +670,179 @@ class Minister(PoliticalRepresentative):
         return minister_dict
 
 
+class DeputyRegistry:
+    """In-memory index of the deputies by normalized name."""
+    def __init__(self, pol_manager):
+        """
+        Initialize an empty registry.
+
+        :param pol_manager: DgraphPoliticalSystemManager used for the lookups
+        """
+        self.pol_manager = pol_manager
+        self.deputies = {}
+        self.missing = set()
+        self.loaded = False
+
+    def load(self):
+        """Populate the registry with all the deputies stored in the database, in one query."""
+        for deputy in self.pol_manager.query_deputies():
+            self.add(Deputy(deputy['name'], deputy.get('party'), deputy['uid']))
+        self.loaded = True
+
+    def add(self, deputy):
+        """
+        Register a deputy.
+
+        :param deputy: Deputy object
+        """
+        key = normalize_name(deputy.name)
+        self.deputies[key] = deputy
+        self.missing.discard(key)
+
+    def get(self, name):
+        """
+        Find a deputy by name.
+
+        Once the registry is loaded, a miss is final. Otherwise the database
+        is queried with query_representative and the result is cached.
+
+        :param name: Name of the deputy
+        :return: Deputy object or None
+        """
+        key = normalize_name(name)
+        if key in self.deputies:
+            return self.deputies[key]
+        if key in self.missing or self.loaded:
+            return None
+
+        deputy_results = self.pol_manager.query_representative(name, 'Deputy')
+        if len(deputy_results)==0 :
+            self.missing.add(key)
+            return None
+        deputy = Deputy(deputy_results[0]['name'], deputy_results[0].get('party'), deputy_results[0]['uid'])
+        self.add(deputy)
+        return deputy
+
+    def __len__(self):
+        return len(self.deputies)
+
+    def __iter__(self):
+        return iter(self.deputies.values())
+
+
+class QueryCache:
+    """Read-through LRU cache of query results, with a time to live per entry."""
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        """
+        Initialize an empty cache.
+
+        :param max_size: Maximum number of entries (0 disables the cache)
+        :param ttl: Time to live of an entry, in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query, variables=None):
+        """Cache key of a query: its text and its variables."""
+        return query, tuple(sorted((variables or {}).items()))
+
+    def get(self, key):
+        """
+        Get a cached result.
+
+        :param key: Cache key
+        :return: Cached result, or None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, result):
+        """
+        Cache a result, evicting the least recently used entries when full.
+
+        :param key: Cache key
+        :param result: Query result
+        """
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry (called after each mutation of the manager)."""
+        with self.lock:
+            if self.entries:
+                self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Counters of the cache, for tuning.
+
+        :return: Dictionary of counters
+        """
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
 class DgraphPoliticalSystemManager:
     """Manages Political System operations in Dgraph."""
-    def __init__(self, connection):
+    def __init__(self, connection, workers=1, cache=None, instrumentation=None):
         """
         Initialize PoliticalSystemManager with a Dgraph connection.
         
         :param connection: DgraphConnection instance
+        :param workers: Number of batches the bulk loaders send concurrently
+        :param cache: QueryCache of the query methods (a default one if None)
+        :param instrumentation: Optional Instrumentation recording the phases and retries
         """
         self.connection = connection
+        self.workers = workers
+        self.cache = cache if cache is not None else QueryCache()
+        self.instrumentation = instrumentation
+        self.deputies = DeputyRegistry(self)
+        self.authors = AuthorResolver(self.deputies)
+        self.commissions = {}
+        self.ministries = {}
+        self._new_entities = []
+        self.source_hashes = {}
+        # Checkpoint journal of the load (see journal.py)
+        self.journal = None
+        # Local mirror recording the batches sent (see mirror.py)
+        self.mirror = None
+        # SimilarQuestions index recording the UIDs of the questions sent
+        self.similar = None
+        # Terms loaded by a term-scoped load (None for all the terms)
+        self.terms = None
 
     def create_representative(self, representative):
         """
@@ -393,6 +856,7 @@ class DgraphPoliticalSystemManager:
             # Create the representative
             response = txn.mutate(set_obj=representative.to_dict())
             txn.commit()
+            self.cache.invalidate()
             
             # Update representative's UID
             #representative.uid = list(dict(response.uids).values())[0]
@@ -406,49 +870,426 @@ class DgraphPoliticalSystemManager:
         finally:
             txn.discard()
 
-    def query_representative(self, name, rep_type=None):
+    def query_representative(self, name, rep_type=None, best_effort=False):
         """
         Query a representative by name and optionally by type.
         
         :param name: Name of the representative to query
         :param rep_type: Type of representative (Deputy or Minister)
+        :param best_effort: Best-effort read (see query)
         :return: List of matching representatives
         """
         # Base query for all representatives
         query = """query all($a: string, $type: string) {
-            all(func: eq(name, $a)) @filter(type($type)) {
+            all(func: eq(name, $a)) @filter(type($type)) %s
+        }""" % REPRESENTATIVE_FIELDS
+
+        # Prepare variables
+        variables = {'$a': name}
+        if rep_type:
+            variables['$type'] = rep_type
+        else:
+            # If no type specified, use a default that matches no type
+            query = query.replace('@filter(type($type))', '')
+
+        # Execute query
+        return self.query(query, variables, best_effort)['all']
+
+    def query_representatives(self, names, rep_type=None):
+        """
+        Query several representatives by name in a single request, with one
+        query block per name.
+
+        :param names: Names of the representatives
+        :param rep_type: Type of representative (Deputy or Minister)
+        :return: Dictionary name -> list of matching representatives
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        type_filter = '@filter(type($type))' if rep_type else ''
+        declarations = ['$n%d: string' % i for i in range(len(names))]
+        variables = {'$n%d' % i: name for i, name in enumerate(names)}
+        if rep_type:
+            declarations.append('$type: string')
+            variables['$type'] = rep_type
+        query = 'query representatives(%s) {\n%s\n}' % (', '.join(declarations), '\n'.join(
+            'n%d(func: eq(name, $n%d)) %s %s' % (i, i, type_filter, REPRESENTATIVE_FIELDS) for i in range(len(names))
+        ))
+        result = self.query(query, variables)
+        return {name: result.get('n%d' % i, []) for i, name in enumerate(names)}
+
+    def query(self, query, variables=None, best_effort=False):
+        """
+        Run a read-only query through the cache, on one of the Alphas (see routing.py).
+
+        The result is shared with the cache and must not be modified.
+
+        :param query: Query text
+        :param variables: Optional query variables
+        :param best_effort: Read from the local state of the Alpha without
+                            waiting for the latest commits (for the dashboards,
+                            which can read slightly stale data)
+        :return: Decoded JSON result
+        """
+        key = QueryCache.key(query, variables)
+        result = self.cache.get(key)
+        if result is None:
+            res = self.connection.reads.query(query, variables, best_effort)
+            result = json.loads(res.json)
+            self.cache.put(key, result)
+        return result
+
+    def query_deputies(self):
+        """
+        Query the uid, name and party of all the deputies.
+
+        :return: List of deputies
+        """
+        query = """{
+            all(func: type(Deputy)) {
                 uid
                 name
                 party
-                type
-                work_at{
-                    commission{
-                        uid
-                        name
-                    }
-                    term
+            }
+        }"""
+        return self.query(query)['all']
+
+    def questions_between(self, start, end, ministry=None):
+        """
+        Query the questions asked during a period, through the index on created_at.
+
+        :param start: Start of the period (datetime, date or ISO string), included
+        :param end: End of the period, included (the whole day for a date)
+        :param ministry: Optional name of the ministry the questions are addressed to
+        :return: List of questions, oldest first
+        """
+        variables = {'$start': to_datetime(start).isoformat(), '$end': to_datetime(end, end=True).isoformat()}
+        ministry_block, ministry_filter = '', ''
+        if ministry is not None:
+            variables['$ministry'] = ministry
+            ministry_block = 'm as var(func: eq(name, $ministry)) @filter(type(Ministry))'
+            ministry_filter = ' AND uid_in(to, uid(m))'
+        query = """query between(%s) {
+            %s
+            questions(func: between(created_at, $start, $end), orderasc: created_at) @filter(type(Question)%s) {
+                uid
+                title
+                state
+                created_at
+                to { name }
+                ~ask { name party }
+            }
+        }""" % (', '.join('%s: string' % name for name in variables), ministry_block, ministry_filter)
+        return self.query(query, variables)['questions']
+
+    def count_questions(self, start, end, bucket='month', ministry=None):
+        """
+        Count the questions asked during each day/week/month/quarter/year of a
+        period, with one indexed range block per bucket in a single
+        (best-effort, for the dashboards) request.
+
+        :param start: Start of the period (datetime, date or ISO string), included
+        :param end: End of the period, included (the whole day for a date)
+        :param bucket: Size of the buckets ('day', 'week', 'month', 'quarter' or 'year')
+        :param ministry: Optional name of the ministry the questions are addressed to
+        :return: List of (start of the bucket, number of questions)
+        """
+        buckets = list(time_buckets(to_datetime(start), to_datetime(end, end=True), bucket))
+        if not buckets:
+            return []
+        variables = {}
+        blocks = []
+        ministry_filter = ''
+        if ministry is not None:
+            variables['$ministry'] = ministry
+            blocks.append('m as var(func: eq(name, $ministry)) @filter(type(Ministry))')
+            ministry_filter = ' AND uid_in(to, uid(m))'
+        for i, (bucket_start, bucket_end) in enumerate(buckets):
+            variables['$s%d' % i] = bucket_start.isoformat()
+            variables['$e%d' % i] = bucket_end.isoformat()
+            blocks.append('b%d(func: between(created_at, $s%d, $e%d)) @filter(type(Question)%s) { count(uid) }' % (
+                i, i, i, ministry_filter))
+        query = 'query buckets(%s) {\n%s\n}' % (', '.join('%s: string' % name for name in variables), '\n'.join(blocks))
+        result = self.query(query, variables, best_effort=True)
+        return [(bucket_start.isoformat(), (result.get('b%d' % i) or [{'count': 0}])[0]['count'])
+                for i, (bucket_start, _) in enumerate(buckets)]
+
+    def laws_by_commission(self, commission):
+        """
+        Query the laws developed by a commission, from the commission node
+        through the reverse developed_by edges.
+
+        :param commission: Name of the commission
+        :return: List of laws, by title (shared with the cache, must not be modified)
+        """
+        query = """query laws($commission: string) {
+            commission(func: eq(name, $commission)) @filter(type(Commission)) {
+                laws: ~developed_by(orderasc: title) {
+                    uid
+                    title
+                    type
+                    link
+                    created_at
                 }
-                ask{
-                    to{
-                        uid
-                        name
-                    }
+            }
+        }"""
+        result = self.query(query, {'$commission': commission})['commission']
+        return result[0].get('laws', []) if result else []
+
+    def questions_to_ministry(self, ministry):
+        """
+        Query the questions addressed to a ministry, from the ministry node
+        through the reverse `to` edges.
+
+        :param ministry: Name of the ministry
+        :return: List of questions, oldest first (shared with the cache, must not be modified)
+        """
+        query = """query questions($ministry: string) {
+            ministry(func: eq(name, $ministry)) @filter(type(Ministry)) {
+                questions: ~to(orderasc: created_at) {
+                    uid
                     title
+                    state
+                    created_at
+                    ~ask { name party }
                 }
             }
         }"""
+        result = self.query(query, {'$ministry': ministry})['ministry']
+        return result[0].get('questions', []) if result else []
 
-        # Prepare variables
-        variables = {'$a': name}
-        if rep_type:
-            variables['$type'] = rep_type
+    def deputies_in_term(self, term, commission=None):
+        """
+        Query the deputies of a term, from the work_at nodes of the term (index
+        on term), or from the commission node when one is given.
+
+        :param term: Term, e.g. '2016_2021'
+        :param commission: Optional name of a commission the deputies worked at during the term
+        :return: List of deputies with their commission during the term, by name
+        """
+        variables = {'$term': term}
+        if commission is None:
+            start = 'var(func: eq(term, $term)) { d as ~work_at }'
         else:
-            # If no type specified, use a default that matches no type
-            query = query.replace('@filter(type($type))', '')
+            variables['$commission'] = commission
+            start = """var(func: eq(name, $commission)) @filter(type(Commission)) {
+                ~commission @filter(eq(term, $term)) { d as ~work_at }
+            }"""
+        query = """query deputies(%s) {
+            %s
+            deputies(func: uid(d), orderasc: name) @filter(type(Deputy)) {
+                uid
+                name
+                party
+                work_at @filter(eq(term, $term)) {
+                    term
+                    commission { uid name }
+                }
+            }
+        }""" % (', '.join('%s: string' % name for name in variables), start)
+        return self.query(query, variables)['deputies']
 
-        # Execute query
-        res = self.connection.client.txn(read_only=True).query(query, variables=variables)
-        return json.loads(res.json)['all']
+    def questions_in_term(self, term, ministry=None):
+        """
+        Query the questions asked during a term, through the index on term.
+
+        :param term: Term, e.g. '2021_2026'
+        :param ministry: Optional name of the ministry the questions are addressed to
+        :return: List of questions, oldest first
+        """
+        variables = {'$term': term}
+        ministry_block, ministry_filter = '', ''
+        if ministry is not None:
+            variables['$ministry'] = ministry
+            ministry_block = 'm as var(func: eq(name, $ministry)) @filter(type(Ministry))'
+            ministry_filter = ' AND uid_in(to, uid(m))'
+        query = """query term(%s) {
+            %s
+            questions(func: eq(term, $term), orderasc: created_at) @filter(type(Question)%s) {
+                uid
+                title
+                state
+                created_at
+                to { name }
+                ~ask { name party }
+            }
+        }""" % (', '.join('%s: string' % name for name in variables), ministry_block, ministry_filter)
+        return self.query(query, variables)['questions']
+
+    def deputies_with_n_terms(self, n):
+        """
+        Query the deputies who served exactly n terms (a deputy has one work_at
+        edge per term), through the count index on work_at.
+
+        :param n: Number of terms
+        :return: List of deputies with their terms, by name
+        """
+        query = """query deputies($n: int) {
+            deputies(func: eq(count(work_at), $n), orderasc: name) @filter(type(Deputy)) {
+                uid
+                name
+                party
+                work_at {
+                    term
+                    commission { name }
+                }
+            }
+        }"""
+        return self.query(query, {'$n': str(n)})['deputies']
+
+    def query_states(self, page_size=DEFAULT_CURSOR_SIZE):
+        """
+        Read the key, UID and state of every question and law, through cursors.
+
+        :param page_size: Number of nodes fetched per request
+        :return: Iterator of (node type, key, UID, state)
+        """
+        query = """{
+            page(func: type(Question), %(page)s) {
+                uid
+                key
+                state
+            }
+        }"""
+        for node in self.paginate(query, page_size=page_size):
+            if 'key' in node:
+                yield 'Question', node['key'], node['uid'], node.get('state')
+
+        query = """{
+            page(func: type(Law), %(page)s) {
+                uid
+                key
+                type
+                link
+                title
+                state
+            }
+        }"""
+        for node in self.paginate(query, page_size=page_size):
+            key = node.get('key') or law_key(node.get('type'), node.get('link'), node.get('title'))
+            yield 'Law', key, node['uid'], node.get('state')
+
+    def paginate(self, query, variables=None, page_size=DEFAULT_CURSOR_SIZE, edge=None):
+        """
+        Iterate over the nodes of a query page by page, in uid order.
+
+        The query has a single block named `page`, and `%(page)s` where the
+        pagination arguments go (on the root function, or on the nested edge
+        when `edge` is given). All the pages are read from the same read-only
+        transaction, hence from the same snapshot, and bypass the cache: only
+        one page is held in memory at a time.
+
+        :param query: Query text
+        :param variables: Optional query variables
+        :param page_size: Number of nodes per page
+        :param edge: Nested edge to paginate, under a root returning a single node
+        :return: Iterator of the nodes (dictionaries)
+        """
+        txn = self.connection.reads.txn()
+        after = None
+        try:
+            while True:
+                page = 'first: %d' % page_size + (', after: %s' % after if after else '')
+                nodes = json.loads(txn.query(query % {'page': page}, variables=variables).json)['page']
+                if edge is not None:
+                    nodes = nodes[0].get(edge, []) if nodes else []
+                yield from nodes
+                if len(nodes) < page_size:
+                    return
+                after = nodes[-1]['uid']
+        finally:
+            txn.discard()
+
+    def cursor_deputies(self, page_size=DEFAULT_CURSOR_SIZE):
+        """
+        Iterate over all the deputies.
+
+        :param page_size: Number of deputies fetched per request
+        :return: Iterator of Deputy objects
+        """
+        query = """{
+            page(func: type(Deputy), %(page)s) {
+                uid
+                name
+                party
+            }
+        }"""
+        for node in self.paginate(query, page_size=page_size):
+            yield Deputy(node['name'], node.get('party'), node['uid'])
+
+    def cursor_laws(self, page_size=DEFAULT_CURSOR_SIZE):
+        """
+        Iterate over all the laws.
+
+        :param page_size: Number of laws fetched per request
+        :return: Iterator of Law objects, with their commission
+        """
+        query = """{
+            page(func: type(Law), %(page)s) {
+                uid
+                title
+                type
+                link
+                developed_by { uid name }
+            }
+        }"""
+        for node in self.paginate(query, page_size=page_size):
+            law = Law(node.get('title'), node.get('type'), node.get('link'))
+            law.uid = node['uid']
+            if 'developed_by' in node:
+                law.commission = Commission(node['developed_by']['name'])
+                law.commission.uid = node['developed_by']['uid']
+            yield law
+
+    def cursor_questions(self, deputy=None, page_size=DEFAULT_CURSOR_SIZE):
+        """
+        Iterate over all the questions, or over the questions of one deputy
+        (paginating its `ask` edge).
+
+        :param deputy: Optional Deputy object or UID
+        :param page_size: Number of questions fetched per request
+        :return: Iterator of Question objects, with their ministry (and author, unless `deputy` is a UID)
+        """
+        fields = """
+                uid
+                title
+                state
+                key
+                to { uid name }"""
+        if deputy is None:
+            query = """{
+            page(func: type(Question), %%(page)s) {%s
+                ~ask { uid name party }
+            }
+        }""" % fields
+            nodes = self.paginate(query, page_size=page_size)
+            author = None
+        else:
+            author = deputy if isinstance(deputy, Deputy) else None
+            query = """query questions($deputy: string) {
+            page(func: uid($deputy)) {
+                ask(%%(page)s) {%s
+                }
+            }
+        }""" % fields
+            uid = deputy.uid if isinstance(deputy, Deputy) else deputy
+            nodes = self.paginate(query, {'$deputy': uid}, page_size, edge='ask')
+
+        for node in nodes:
+            ministry = None
+            if 'to' in node:
+                ministry = Ministry(node['to']['name'])
+                ministry.uid = node['to']['uid']
+            question = Question(node.get('title'), ministry, node.get('state'))
+            question.uid = node['uid']
+            question.key = node.get('key')
+            if author is not None:
+                question.author = author
+            elif node.get('~ask'):
+                asker = node['~ask'][0]
+                question.author = Deputy(asker['name'], asker.get('party'), asker['uid'])
+            yield question
 
     def create_law_in_commission(self, commission, title, law_type, link=None):
         """
@@ -468,6 +1309,7 @@ class DgraphPoliticalSystemManager:
             
             response = txn.mutate(set_obj=law.to_dict())
             txn.commit()
+            self.cache.invalidate()
             
             # Update law's UID
             law.uid = list(dict(response.uids).values())[0]
@@ -478,141 +1320,1457 @@ class DgraphPoliticalSystemManager:
         finally:
             txn.discard()
 
-def create_deputies(pol_manager,dict_commissions):
-    
-    for term in ['2011_2016','2016_2021','2021_2026'] :
-        with open('data/parliamentarians_arabic_%s.json'%term, 'r') as file:
-            data = json.load(file)
-
-        for deputy in tqdm(data):
-            deputy_results = pol_manager.query_representative(deputy['name'], 'Deputy')
-
-            if len(deputy_results)>0 :
-                deputy_g = Deputy(deputy['name'], deputy['party'],deputy_results[0]['uid'])
-            else :
-                deputy_g = Deputy(deputy['name'], deputy['party'])
-
-            if 'function' in deputy:
-                if "فريق" in deputy['function'] :
-                    deputy_g.add_commission(dict_commissions['Nothing'],term)
-                else :
-                    commission_obj = dict_commissions[process_commission(deputy['function'])]
-                    deputy_g.add_commission(commission_obj,term)
-
-            pol_manager.create_representative(deputy_g)
-            if len(deputy_results)>0 :
-                deputy_results = pol_manager.query_representative(deputy['name'], 'Deputy')
-                #print(deputy_results)
-
-def create_laws(pol_manager,dict_commissions):
-    with open('data/laws_arabic_version.json', 'r') as file:
-        data = json.load(file)
-    
-    for project in tqdm(data['projets_de_loi']):
-        commission_obj = dict_commissions[process_commission(project['readings'][0]['commission'])]
-        pol_manager.create_law_in_commission(
-            commission_obj,
-            title=project['title'],
-            law_type='projets_de_loi',
-            link=project['url']
+    def bulk_create(self, objects, batch_size=DEFAULT_BATCH_SIZE, wrap=None, stream=None):
+        """
+        Create objects in the database, committing once per batch.
+
+        New objects are sent with a blank node UID which is mapped back
+        to the object from the mutation response.
+
+        :param objects: Iterable of Commission, Ministry, Deputy, Law or Question objects
+        :param batch_size: Number of objects sent in a single mutation
+        :param wrap: Optional function (obj, obj_dict) -> mutation dict, used to
+                     attach the object to an existing node
+        :param stream: Name of the stream of objects, checkpointed in the journal (see _send_batches)
+        :return: Number of objects created
+        """
+        return self._send_batches(
+            lambda batch, checkpoint=None: self._commit_batch(batch, wrap, checkpoint),
+            batched(objects, batch_size),
+            stream
         )
-    
-    
-    for project in tqdm(data['propositions_de_loi']):
-        if len(project['readings'])>0 : 
-            if 'commission' in project['readings'][0]:          
-                commission_obj = dict_commissions[process_commission(project['readings'][0]['commission'])]
-                pol_manager.create_law_in_commission(
-                    commission_obj,
-                    title=project['title'],
-                    law_type='propositions_de_loi',
-                    link=project['url']
-                )
-    
-    for project in tqdm(data['textes_de_loi']):
-        commission_obj = dict_commissions[process_commission(project['commission'])]
-        pol_manager.create_law_in_commission(
-            commission_obj,
-            title=project['title'],
-            law_type='textes_de_loi',
-            link=project['url']
+
+    def _commit_batch(self, batch, wrap=None, checkpoint=None):
+        """
+        Send one batch of objects in a single transaction.
+
+        :param batch: List of objects to create
+        :param wrap: Optional function (obj, obj_dict) -> mutation dict
+        :param checkpoint: Optional checkpoint of the batch, committed in the same transaction
+        :return: Number of objects created
+        """
+        payload = []
+        for i, obj in enumerate(batch):
+            obj_dict = obj.to_dict()
+            if not obj.uid:
+                obj_dict['uid'] = '_:n%d' % i
+            payload.append(wrap(obj, obj_dict) if wrap else obj_dict)
+        if checkpoint:
+            payload.append({'dgraph.type': 'Checkpoint', 'checkpoint': checkpoint})
+
+        txn = self.connection.client.txn()
+        try:
+            response = txn.mutate(set_obj=payload)
+            txn.commit()
+            self.cache.invalidate()
+        finally:
+            txn.discard()
+
+        uids = dict(response.uids)
+        for i, obj in enumerate(batch):
+            if not obj.uid:
+                obj.uid = uids.get('n%d' % i)
+        return len(batch)
+
+    def bulk_upsert(self, objects, build, batch_size=DEFAULT_BATCH_SIZE, stream=None):
+        """
+        Insert or update objects with upsert blocks, committing once per batch.
+
+        `build(obj, var)` returns an Upsert whose query blocks and variables
+        are named after `var`, so that every object of the batch gets its own.
+        The mutation of an object is only applied when its condition holds,
+        i.e. when the node is new or changed. Objects whose key was already
+        seen in the batch are skipped.
+
+        :param objects: Iterable of objects to upsert
+        :param build: Function (obj, var) -> Upsert
+        :param batch_size: Number of objects sent in a single request
+        :param stream: Name of the stream of objects, checkpointed in the journal (see _send_batches)
+        :return: Number of objects sent
+        """
+        return self._send_batches(
+            lambda batch, checkpoint=None: self._upsert_batch(batch, build, checkpoint),
+            batched(objects, batch_size),
+            stream
         )
-def create_questions(pol_manager,dict_ministry):
-
-    for i in range(1,6):
-        with open('data/questions_%d.json'%i, 'r') as file:
-            data = json.load(file)
-        for q in tqdm(data) :
-
-            ministry = dict_ministry[q['to']]
-            question = Question(q['title'],ministry,q['state'])
-
-            deputy_results = pol_manager.query_representative(q['author'], 'Deputy')
-            if len(deputy_results)>0 : 
-                txn = pol_manager.connection.client.txn()
-                deputy = deputy_results[0]
-                mutation = {'uid':deputy['uid'],
-                            'ask' : question.to_dict()
+
+    def _upsert_batch(self, batch, build, checkpoint=None):
+        """
+        Send one batch of upserts in a single request.
+
+        :param batch: List of objects to upsert
+        :param build: Function (obj, var) -> Upsert
+        :param checkpoint: Optional checkpoint of the batch, committed in the same request
+        :return: Number of objects sent
+        """
+        txn = self.connection.client.txn()
+        try:
+            blocks, variables, mutations, keys = [], {}, [], set()
+            for i, obj in enumerate(batch):
+                upsert = build(obj, 'v%d' % i)
+                if upsert.key in keys:
+                    continue
+                keys.add(upsert.key)
+                blocks.extend(upsert.blocks)
+                variables.update(upsert.variables)
+                mutations.append(txn.create_mutation(set_obj=upsert.set_obj, cond=upsert.cond))
+            count = len(mutations)
+            if checkpoint:
+                mutations.append(txn.create_mutation(set_obj={'dgraph.type': 'Checkpoint', 'checkpoint': checkpoint}))
+
+            query = 'query upsert(%s) {\n%s\n}' % (
+                ', '.join('%s: string' % name for name in variables),
+                '\n'.join(blocks)
+            )
+            request = txn.create_request(query=query, variables=variables, mutations=mutations, commit_now=True)
+            txn.do_request(request)
+            self.cache.invalidate()
+            return count
+        finally:
+            txn.discard()
+
+    def _send_batches(self, send, batches, stream=None):
+        """
+        Send batches one after the other, or concurrently over a bounded pool
+        of `self.workers` threads when there are several workers.
+
+        When a journal is set and the batches form a named stream, each batch
+        is committed along with a Checkpoint node ('<stream>#<batch id>') and
+        recorded in the journal. The batches already committed by an
+        interrupted load are skipped, their objects getting their UIDs back
+        from the journal. The batches are also recorded by the mirror and the
+        similarity index, if any.
+
+        :param send: Function (batch, checkpoint=None) sending one batch and returning its size
+        :param batches: Iterable of batches
+        :param stream: Optional name of the stream of batches
+        :return: Number of objects sent
+        """
+        journaled = self.journal is not None and stream is not None
+
+        def pending_batches():
+            for batch_id, batch in enumerate(batches):
+                if journaled and self.journal.is_committed(stream, batch_id):
+                    self.restore_uids(batch)
+                    self.batch_committed(batch)
+                else:
+                    yield batch_id, batch
+
+        def send_batch(batch_id, batch):
+            if not journaled:
+                count = self._retry(send, batch)
+            else:
+                count = self._retry(send, batch, checkpoint='%s#%d' % (stream, batch_id))
+                self.journal.record_batch(stream, batch_id, {object_key(obj): obj.uid for obj in batch if obj.uid})
+            self.batch_committed(batch)
+            return count
+
+        if self.workers <= 1:
+            count = 0
+            for batch_id, batch in pending_batches():
+                self.flush_entities()
+                count += send_batch(batch_id, batch)
+            return count
+
+        count = 0
+        pending = set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch_id, batch in pending_batches():
+                self.flush_entities()
+                # Bound the number of batches held in memory
+                if len(pending) >= 2 * self.workers:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    count += sum(future.result() for future in done)
+                pending.add(executor.submit(send_batch, batch_id, batch))
+            count += sum(future.result() for future in concurrent.futures.as_completed(pending))
+        return count
+
+    def _retry(self, send, batch, **kwargs):
+        """
+        Send a batch, retrying with exponential backoff when its transaction
+        is aborted (e.g. two batches adding questions to the same deputy).
+
+        :param send: Function sending one batch
+        :param batch: Batch to send
+        :param kwargs: Extra arguments of `send`
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return send(batch, **kwargs)
+            except (pydgraph.AbortedError, pydgraph.RetriableError) as e:
+                if attempt == MAX_RETRIES:
+                    print(f"Error sending batch: {e}")
+                    raise
+                if self.instrumentation:
+                    self.instrumentation.count('retries')
+                time.sleep(RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+            except Exception as e:
+                print(f"Error sending batch: {e}")
+                raise
+
+    def batch_committed(self, batch):
+        """
+        Record a committed batch in the mirror and the similarity index, if any.
+
+        :param batch: List of objects sent
+        """
+        self.mirror_batch(batch)
+        if self.similar is not None:
+            self.similar.record(batch)
+
+    def mirror_batch(self, batch):
+        """
+        Record a batch in the mirror, if any.
+
+        :param batch: List of objects sent
+        """
+        if self.mirror is None:
+            return
+        for obj in batch:
+            if isinstance(obj, Deputy):
+                self.mirror.add_deputy(obj)
+            elif isinstance(obj, Law):
+                self.mirror.add_law(obj)
+            elif isinstance(obj, Question):
+                self.mirror.add_question(obj)
+            elif isinstance(obj, StateChange) and obj.node_type == 'Question':
+                self.mirror.set_question_state(obj.key, obj.state)
+
+    def begin_stream(self, stream, content_hash=None):
+        """
+        Declare a stream of batches to the journal, if any.
+
+        :param stream: Name of the stream
+        :param content_hash: Content hash of its sources
+        :return: Name of the stream
+        """
+        if self.journal is not None:
+            self.journal.begin_stream(stream, content_hash)
+        return stream
+
+    def restore_uids(self, batch):
+        """
+        Give the objects of a batch committed by an interrupted load their UIDs back.
+
+        :param batch: List of objects
+        """
+        for obj in batch:
+            if not obj.uid:
+                obj.uid = self.journal.uids.get(object_key(obj))
+
+    def load_checkpoints(self):
+        """Add the batches whose checkpoint was committed but not journaled to the journal."""
+        query = """{
+            all(func: type(Checkpoint)) {
+                checkpoint
+            }
+        }"""
+        self.journal.mark_committed(node['checkpoint'] for node in self.query(query)['all'])
+
+    def clear_checkpoints(self):
+        """Delete the Checkpoint nodes, once the load completed or before a new one."""
+        txn = self.connection.client.txn()
+        try:
+            mutation = txn.create_mutation(del_nquads='uid(c) * * .')
+            request = txn.create_request(query='{ c as var(func: type(Checkpoint)) }', mutations=[mutation],
+                                         commit_now=True)
+            txn.do_request(request)
+            self.cache.invalidate()
+        finally:
+            txn.discard()
+
+    def query_entities(self, type_name):
+        """
+        Query the uid and name of all the nodes of a type (e.g. Commission, Ministry).
+
+        :param type_name: Dgraph type of the nodes
+        :return: Dictionary name -> uid
+        """
+        query = """query all($type: string) {
+            all(func: type($type)) {
+                uid
+                name
+            }
+        }"""
+        return {entity['name']: entity['uid'] for entity in self.query(query, {'$type': type_name})['all']}
+
+    def phase(self, name):
+        """
+        Context manager measuring a phase of the load when the manager is instrumented.
+        It gives a dictionary where the phase records its number of records.
+
+        :param name: Name of the phase
+        """
+        if self.instrumentation:
+            return self.instrumentation.phase(name)
+        return contextlib.nullcontext({})
+
+    def commission(self, name):
+        """
+        Get the Commission of a name, creating it with the next batch if it is new.
+
+        :param name: Name of the commission
+        :return: Commission object
+        """
+        return self._entity(self.commissions, Commission, name)
+
+    def ministry(self, name):
+        """
+        Get the Ministry of a name, creating it with the next batch if it is new.
+
+        :param name: Name of the ministry
+        :return: Ministry object
+        """
+        return self._entity(self.ministries, Ministry, name)
+
+    def _entity(self, entities, entity_class, name):
+        entity = entities.get(name)
+        if entity is None:
+            entity = entities[name] = entity_class(name)
+            self._new_entities.append(entity)
+        return entity
+
+    def load_entities(self):
+        """Load the commissions and ministries already stored in the database, in one query each."""
+        for entities, entity_class in [(self.commissions, Commission), (self.ministries, Ministry)]:
+            for name, uid in self.query_entities(entity_class.__name__).items():
+                entities[name] = entity_class(name)
+                entities[name].uid = uid
+
+    def flush_entities(self):
+        """
+        Create the commissions and ministries referenced since the last flush.
+
+        Called before each batch is sent, so that the batches only reference
+        committed entities, even when they are sent concurrently.
+        """
+        if self._new_entities:
+            new_entities, self._new_entities = self._new_entities, []
+            self._retry(self._commit_batch, new_entities)
+
+    def load_source_hashes(self):
+        """Load the content hash of the source files already loaded in the database."""
+        query = """{
+            all(func: type(Source)) {
+                source_file
+                content_hash
+            }
+        }"""
+        self.source_hashes = {source['source_file']: source['content_hash'] for source in self.query(query)['all']}
+
+    def changed_source(self, path):
+        """
+        Check whether a source file changed since it was last loaded.
+
+        :param path: Path of the source file
+        :return: Content hash of the file, or None if it is unchanged
+        """
+        content_hash = hash_file(path)
+        # A file started by an interrupted load is read again, its committed batches being skipped
+        if self.journal is not None and path in self.journal.hashes:
+            return content_hash
+        # A term-scoped load reads every file of its terms
+        if self.terms is not None:
+            return content_hash
+        if self.source_hashes.get(path) == content_hash:
+            return None
+        return content_hash
+
+    def set_source_hash(self, path, content_hash):
+        """
+        Record the content hash of a loaded source file.
+
+        :param path: Path of the source file
+        :param content_hash: Content hash of the file
+        """
+        txn = self.connection.client.txn()
+        try:
+            mutation = txn.create_mutation(set_obj={
+                'uid': 'uid(s)',
+                'dgraph.type': 'Source',
+                'source_file': path,
+                'content_hash': content_hash
+            })
+            request = txn.create_request(
+                query='query source($path: string) { s as var(func: eq(source_file, $path)) }',
+                variables={'$path': path},
+                mutations=[mutation],
+                commit_now=True
+            )
+            txn.do_request(request)
+            self.cache.invalidate()
+            self.source_hashes[path] = content_hash
+        finally:
+            txn.discard()
+
+    def drop_term(self, term, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Delete the work_at nodes and questions of a term, with the edges
+        pointing to them (ask, similar_to, work_at), the state history of the
+        questions, their analytics rows, and the deputies left without any
+        term or question. The other terms are not touched.
+
+        :param term: Term to drop
+        :param batch_size: Number of nodes deleted per mutation
+        :return: Number of deletions sent
+        """
+        deletions = []
+        query = """query term($term: string) {
+            page(func: eq(term, $term), %(page)s) @filter(type(Question)) {
+                uid
+                ~ask { uid }
+                ~similar_to { uid }
+                state_history { uid }
+            }
+        }"""
+        for node in self.paginate(query, {'$term': term}):
+            deletions.append({'uid': node['uid']})
+            deletions.extend({'uid': author['uid'], 'ask': [{'uid': node['uid']}]} for author in node.get('~ask', []))
+            deletions.extend({'uid': other['uid'], 'similar_to': [{'uid': node['uid']}]}
+                             for other in node.get('~similar_to', []))
+            deletions.extend({'uid': change['uid']} for change in node.get('state_history', []))
+
+        # The other nodes of the term are its work_at nodes
+        query = """query term($term: string) {
+            page(func: eq(term, $term), %(page)s) @filter(NOT type(Question)) {
+                uid
+                ~work_at {
+                    uid
+                    count(work_at)
+                    other: count(ask @filter(NOT eq(term, $term)))
                 }
-                mut_rep = txn.mutate(set_obj=mutation)
-                question.uid = list(dict(mut_rep.uids).values())[0]
-                txn.commit()
-                txn.discard()
-            
-            deputy_results = pol_manager.query_representative(q['author'], 'Deputy')
+            }
+        }"""
+        for node in self.paginate(query, {'$term': term}):
+            # The work_at nodes have no type: their predicates are deleted one by one
+            deletions.append({'uid': node['uid'], 'term': None, 'commission': None, 'key': None})
+            for deputy in node.get('~work_at', []):
+                if deputy.get('count(work_at)', 0) <= 1 and not deputy.get('other'):
+                    deletions.append({'uid': deputy['uid']})
+                else:
+                    deletions.append({'uid': deputy['uid'], 'work_at': [{'uid': node['uid']}]})
+
+        count = self._send_batches(self._delete_batch, batched(deletions, batch_size))
+        for i in QUESTIONS_FILES:
+            self.replace_stats('questions', term_source(QUESTIONS_PATH%i, term), [])
+        return count
+
+    def _delete_batch(self, batch):
+        """
+        Send one batch of deletions in a single transaction.
 
+        :param batch: List of deletion dictionaries (a bare uid deletes the whole node)
+        :return: Number of deletions
+        """
+        txn = self.connection.client.txn()
+        try:
+            txn.mutate(del_obj=batch)
+            txn.commit()
+            self.cache.invalidate()
+        finally:
+            txn.discard()
+        return len(batch)
 
+    def replace_stats(self, table, source, rows):
+        """
+        Replace the Stat nodes of an analytics table coming from a source, in one request.
 
+        :param table: Name of the table
+        :param source: Source of the rows
+        :param rows: List of dictionaries dimension -> value, with a 'count'
+        """
+        txn = self.connection.client.txn()
+        try:
+            mutations = [txn.create_mutation(del_nquads='uid(s) * * .')]
+            nodes = []
+            for row in rows:
+                node = {'dgraph.type': 'Stat', 'stat': table, 'stat_source': source}
+                node.update(('stat_' + dim, value) for dim, value in row.items() if value is not None)
+                nodes.append(node)
+            if nodes:
+                mutations.append(txn.create_mutation(set_obj=nodes))
+            request = txn.create_request(
+                query='query stats($table: string, $source: string) { s as var(func: eq(stat_source, $source)) @filter(eq(stat, $table)) }',
+                variables={'$table': table, '$source': source},
+                mutations=mutations,
+                commit_now=True
+            )
+            txn.do_request(request)
+            self.cache.invalidate()
+        finally:
+            txn.discard()
 
+    def query_stats(self, table, filters=None):
+        """
+        Query the rows of an analytics table, starting from the index of the
+        last filter (or of the table name when there is none). The tables are
+        read by the dashboards, with best-effort queries.
 
+        :param table: Name of the table
+        :param filters: Dictionary dimension -> value
+        :return: List of rows (stat_<dimension> and stat_count)
+        """
+        conditions = ['eq(stat, $table)']
+        variables = {'$table': table}
+        declarations = ['$table: string']
+        for dim, value in (filters or {}).items():
+            conditions.append('eq(stat_%s, $%s)' % (dim, dim))
+            variables['$' + dim] = str(value)
+            declarations.append('$%s: %s' % (dim, 'int' if dim == 'terms' else 'string'))
+
+        query = """query stats(%s) {
+            all(func: %s) @filter(%s) {
+                expand(Stat)
+            }
+        }""" % (', '.join(declarations), conditions[-1], ' AND '.join(conditions[:-1]) or 'has(stat)')
+        return self.query(query, variables, best_effort=True)['all']
 
-def main():
-    # Create Dgraph connection
-    connection = DgraphConnection()
-    
-    # Drop all existing data and set schema
-    connection.drop_all()
-    connection.set_schema()
-    
-    # Create political system manager
-    pol_manager = DgraphPoliticalSystemManager(connection)
+    def query_tenures(self):
+        """
+        Query the party and number of terms of every deputy (one work_at
+        node per term served, with or without a commission).
 
-    
-    # Create a commissions
-    commissions = set.union(extract_commissions_from_deputies(),extract_commissions_from_laws())
-    commissions.add('Nothing')
-
-    dict_commissions = {}
-    for c in commissions : 
-        txn = pol_manager.connection.client.txn()
-        dict_commissions[c] = Commission(c)
-        commission_response = txn.mutate(set_obj=dict_commissions[c].to_dict())
-        #print(c,list(dict(commission_response.uids).values())[0])
-        dict_commissions[c].uid = list(dict(commission_response.uids).values())[0]
-        txn.commit()
-        txn.discard()
-    #print(dict_commissions["Nothing"].uid)
-    # Create Ministries
-
-    ministries = extract_ministry_from_questions()
-    dict_ministry = {}
-    for c in ministries :
-        txn = pol_manager.connection.client.txn()
-        dict_ministry[c] = Ministry(c)
-        ministry_response = txn.mutate(set_obj=dict_ministry[c].to_dict())
-        dict_ministry[c].uid = list(dict(ministry_response.uids).values())[0]
-        txn.commit()
-        txn.discard()
+        :return: List of deputies
+        """
+        query = """{
+            all(func: type(Deputy)) {
+                party
+                terms: count(work_at)
+            }
+        }"""
+        return self.query(query)['all']
 
+    def term_frequencies(self, type_name, terms):
+        """
+        Document frequencies of title terms over the whole corpus of a type,
+        counted in Dgraph through the index on title_terms (one block per term).
+
+        :param type_name: Dgraph type (Law or Question)
+        :param terms: Normalized terms (see check_data.title_terms)
+        :return: Tuple (number of nodes of the type, dictionary term -> number of nodes having it)
+        """
+        # The terms only contain Arabic letters and digits, they can be inlined
+        blocks = ['n(func: type(%s)) { count(uid) }' % type_name]
+        blocks.extend('t%d(func: eq(title_terms, %s)) @filter(type(%s)) { count(uid) }' % (
+            i, json.dumps(term, ensure_ascii=False), type_name) for i, term in enumerate(terms))
+        result = self.query('{\n%s\n}' % '\n'.join(blocks))
+
+        def count(block):
+            return block[0].get('count', 0) if block else 0
+
+        return count(result['n']), {term: count(result['t%d' % i]) for i, term in enumerate(terms)}
+
+    def search(self, type_name, text, fields, first=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        Full-text search over the titles of one type of node.
+
+        The candidates are the nodes sharing at least one term with the text,
+        found through the index on title_terms, and fetched with their terms
+        only. They are ranked by the sum of the inverse document frequencies
+        of the terms they match over the whole corpus (rare words weigh more,
+        see term_frequencies), then by the number of terms of their title.
+        The fields are then fetched for the hits of the page only.
+
+        :param type_name: Dgraph type (Law or Question)
+        :param text: Searched text
+        :param fields: Predicates returned for each hit
+        :param first: Number of hits per page
+        :param offset: Number of hits skipped
+        :return: Dictionary with the total number of hits and the hits of the page (with their score)
+        """
+        terms = title_terms(text)
+        if not terms:
+            return {'total': 0, 'hits': []}
+        size, frequencies = self.term_frequencies(type_name, terms)
+        idf = {term: math.log(1 + size / count) for term, count in frequencies.items() if count}
+        query = """{
+            hits(func: eq(title_terms, %s)) @filter(type(%s)) {
+                uid
+                title_terms
+            }
+        }""" % (json.dumps(terms, ensure_ascii=False), type_name)
+        hits = self.query(query)['hits']
+        ranked = sorted(((sum(idf.get(term, 0.0) for term in set(hit['title_terms'])), hit) for hit in hits),
+                        key=lambda item: (-item[0], len(item[1]['title_terms'])))[offset:offset + first]
+        if not ranked:
+            return {'total': len(hits), 'hits': []}
+
+        query = """{
+            page(func: uid(%s)) {
+                uid
+                %s
+            }
+        }""" % (', '.join(hit['uid'] for _, hit in ranked), '\n'.join(fields))
+        nodes = {node['uid']: node for node in self.query(query)['page']}
+        # The cached result is shared, the hits are copied rather than annotated
+        page = [dict(nodes.get(hit['uid'], {'uid': hit['uid']}), score=score) for score, hit in ranked]
+        return {'total': len(hits), 'hits': page}
+
+    def search_laws(self, text, first=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        Search the laws by title.
+
+        :param text: Searched text
+        :param first: Number of hits per page
+        :param offset: Number of hits skipped
+        :return: Dictionary with the total number of hits and the ranked laws of the page
+        """
+        return self.search('Law', text, ['title', 'type', 'link', 'developed_by { name }'], first, offset)
+
+    def search_questions(self, text, first=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        Search the questions by title.
+
+        :param text: Searched text
+        :param first: Number of hits per page
+        :param offset: Number of hits skipped
+        :return: Dictionary with the total number of hits and the ranked questions of the page
+        """
+        return self.search('Question', text, ['title', 'state', 'to { name }', '~ask { name }'], first, offset)
+
+    def query_band_candidates(self, band_keys, page_size=DEFAULT_CURSOR_SIZE):
+        """
+        Iterate over the stored questions having one of some LSH bands
+        (index lookup on minhash_bands, BAND_LOOKUP_SIZE bands per query).
+
+        :param band_keys: List of band keys (see similarity.bands)
+        :param page_size: Number of questions fetched per request
+        :return: Iterator of the questions (uid, key and title)
+        """
+        for i in range(0, len(band_keys), BAND_LOOKUP_SIZE):
+            # The band keys only contain digits, letters and ':', they can be inlined
+            query = """{
+                page(func: eq(minhash_bands, %s), %%(page)s) @filter(type(Question)) {
+                    uid
+                    key
+                    title
+                }
+            }""" % json.dumps(band_keys[i:i + BAND_LOOKUP_SIZE])
+            yield from self.paginate(query, page_size=page_size)
+
+    def find_similar_questions(self, title, threshold=SIMILARITY_THRESHOLD, first=DEFAULT_PAGE_SIZE):
+        """
+        Find the questions whose title is a near-duplicate of a title.
+
+        The candidates share at least one LSH band with the title (index
+        lookup on minhash_bands), and are ranked by the Jaccard similarity
+        estimated from their MinHash signatures.
+
+        :param title: Title of a question
+        :param threshold: Minimum estimated similarity
+        :param first: Maximum number of questions returned
+        :return: List of questions with their similarity, the most similar first
+        """
+        sig = signature(title)
+        if sig is None:
+            return []
+        # The band keys only contain digits, letters and ':', they can be inlined
+        query = """{
+            hits(func: eq(minhash_bands, %s)) @filter(type(Question)) {
+                uid
+                title
+                state
+                to { name }
+                ~ask { name }
+            }
+        }""" % json.dumps(list(bands(sig)))
+        hits = self.query(query)['hits']
+        ranked = sorted(((similarity(sig, signature(hit['title'])), hit) for hit in hits if signature(hit['title'])),
+                        key=lambda item: -item[0])
+        return [dict(hit, similarity=score) for score, hit in ranked if score >= threshold][:first]
+
+
+# Upsert of one object: the query blocks and variables it needs, its
+# mutation and the condition under which the mutation is applied
+Upsert = collections.namedtuple('Upsert', ['key', 'blocks', 'variables', 'set_obj', 'cond'])
+
+
+def upsert_deputy(deputy, var):
+    """Upsert a Deputy keyed on its name, and its work_at nodes keyed on name and term."""
+    deputy_dict = deputy.to_dict()
+    deputy_dict['uid'] = 'uid(%s)' % var
+    blocks = [
+        '%s as var(func: eq(name, $%s)) @filter(type(Deputy))' % (var, var),
+        '%s_same as var(func: uid(%s)) @filter(eq(party, $%s_party))' % (var, var, var)
+    ]
+    variables = {'$' + var: deputy.name, '$%s_party' % var: deputy.party}
+    conditions = ['eq(len(%s_same), 0)' % var]
+
+    for i, work_at in enumerate(deputy_dict['work_at']):
+        work_var = '%s_w%d' % (var, i)
+        work_at['uid'] = 'uid(%s)' % work_var
+        blocks.append('%s as var(func: eq(key, $%s))' % (work_var, work_var))
+        if 'commission' in work_at:
+            blocks.append('%s_same as var(func: uid(%s)) @filter(uid_in(commission, %s))' % (
+                work_var, work_var, work_at['commission']['uid']))
+        else:
+            blocks.append('%s_same as var(func: uid(%s)) @filter(NOT has(commission))' % (work_var, work_var))
+        variables['$' + work_var] = work_at['key']
+        conditions.append('eq(len(%s_same), 0)' % work_var)
+
+    return Upsert(normalize_name(deputy.name), blocks, variables, deputy_dict,
+                  '@if(%s)' % ' OR '.join(conditions))
+
+
+def upsert_law(law, var):
+    """Upsert a Law, keyed on type + link + title (several laws share a link)."""
+    law_dict = law.to_dict()
+    law_dict['uid'] = 'uid(%s)' % var
+    key = law_dict['key']
+    variables = {'$' + var: key}
+    same_state = ''
+    if law.state:
+        variables['$%s_state' % var] = law.state
+        same_state = ' AND eq(state, $%s_state)' % var
+    return Upsert(
+        key,
+        ['%s as var(func: eq(key, $%s)) @filter(type(Law))' % (var, var),
+         '%s_same as var(func: uid(%s)) @filter(uid_in(developed_by, %s)%s)' % (
+             var, var, law.commission.uid, same_state)],
+        variables,
+        law_dict,
+        '@if(eq(len(%s_same), 0))' % var
+    )
+
+
+def upsert_question(question, var):
+    """Upsert a Question keyed on title + author + date, attached to its author."""
+    q_dict = question.to_dict()
+    q_dict['uid'] = 'uid(%s)' % var
+    return Upsert(
+        question.key,
+        ['%s as var(func: eq(key, $%s)) @filter(type(Question))' % (var, var),
+         '%s_same as var(func: uid(%s)) @filter(eq(state, $%s_state))' % (var, var, var)],
+        {'$' + var: question.key, '$%s_state' % var: question.state},
+        {'uid': question.author.uid, 'ask': q_dict},
+        '@if(eq(len(%s_same), 0))' % var
+    )
+
+def upsert_similar(link, var):
+    """Add similar_to edges between questions found by key."""
+    blocks = ['%s as var(func: eq(key, $%s)) @filter(type(Question))' % (var, var)]
+    variables = {'$' + var: link.key}
+    similar = []
+    for i, other in enumerate(link.similar):
+        other_var = '%s_s%d' % (var, i)
+        blocks.append('%s as var(func: eq(key, $%s)) @filter(type(Question))' % (other_var, other_var))
+        variables['$' + other_var] = other
+        similar.append({'uid': 'uid(%s)' % other_var})
+    return Upsert(link.key, blocks, variables, {'uid': 'uid(%s)' % var, 'similar_to': similar}, None)
+
+class RdfExporter(DgraphPoliticalSystemManager):
+    """
+    Writes the objects of the loaders as gzipped N-Quads for `dgraph bulk`
+    or `dgraph live`, instead of sending them to a Dgraph server.
+
+    Nodes get stable blank node IDs derived from their keys, so two exports
+    of the same data are identical.
+    """
+    def __init__(self, output_dir):
+        """
+        Initialize an exporter writing to a directory.
+
+        :param output_dir: Directory receiving barlamane.rdf.gz and barlamane.schema
+        """
+        super().__init__(connection=None)
+        # Nothing to look up: the export describes a fresh database
+        self.deputies.loaded = True
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.rdf_path = os.path.join(output_dir, 'barlamane.rdf.gz')
+        self.schema_path = os.path.join(output_dir, 'barlamane.schema')
+        with open(self.schema_path, 'w') as file:
+            file.write(DgraphConnection.SCHEMA)
+        self.out = gzip.open(self.rdf_path, 'wt', encoding='utf-8')
+        self.emitted = set()
+        self.anonymous = itertools.count()
+        self.quads = 0
+
+    def _commit_batch(self, batch, wrap=None, checkpoint=None):
+        """
+        Write one batch of objects as N-Quads.
+
+        :param batch: List of objects to export
+        :param wrap: Optional function (obj, obj_dict) -> mutation dict
+        :param checkpoint: Ignored, exports are not journaled
+        :return: Number of objects exported
+        """
+        for obj in batch:
+            if not obj.uid:
+                obj.uid = stable_blank_node(obj)
+            obj_dict = obj.to_dict()
+            self.write_node(wrap(obj, obj_dict) if wrap else obj_dict)
+        return len(batch)
+
+    def write_node(self, node, nested=False):
+        """
+        Write the N-Quads of a mutation dictionary and return its subject.
+
+        Nested nodes that were already written (e.g. the commission of a law)
+        only get the edge to them.
+
+        :param node: Mutation dictionary
+        :param nested: Whether the node is the value of an edge
+        :return: Subject of the node
+        """
+        if 'uid' in node:
+            subject = node['uid'] if node['uid'].startswith('_:') else '<%s>' % node['uid']
+        elif 'key' in node:
+            subject = '_:%s' % hashlib.sha1(node['key'].encode('utf-8')).hexdigest()
+        else:
+            subject = '_:anonymous%d' % next(self.anonymous)
+
+        if nested and subject in self.emitted:
+            return subject
+        self.emitted.add(subject)
+
+        for predicate, value in node.items():
+            if predicate == 'uid' or value is None:
+                continue
+            for item in (value if isinstance(value, list) else [value]):
+                if isinstance(item, dict):
+                    obj = self.write_node(item, nested=True)
+                else:
+                    obj = rdf_literal(item)
+                self.out.write('%s <%s> %s .\n' % (subject, predicate, obj))
+                self.quads += 1
+        return subject
+
+    def set_source_hash(self, path, content_hash):
+        self._commit_batch([SourceFile(path, content_hash)])
+
+    def close(self):
+        """Close the RDF file."""
+        self.out.close()
+
+
+class SourceFile:
+    """Content hash of a loaded source file."""
+    __slots__ = ('uid', 'path', 'content_hash')
+
+    def __init__(self, path, content_hash):
+        self.uid = None
+        self.path = path
+        self.content_hash = content_hash
+
+    def to_dict(self):
+        source_dict = {
+            'dgraph.type': 'Source',
+            'source_file': self.path,
+            'content_hash': self.content_hash
+        }
+
+        if self.uid:
+            source_dict['uid'] = self.uid
+
+        return source_dict
+
+
+class StateChange:
+    """Transition of the state of a stored question or law, recorded as a StateChange history node."""
+    __slots__ = ('node_type', 'uid', 'key', 'previous', 'state', 'changed_at')
+
+    def __init__(self, node_type, uid, key, previous, state, changed_at):
+        """
+        :param node_type: Type of the node (Question or Law)
+        :param uid: UID of the node
+        :param key: Key of the node (see StateIndex)
+        :param previous: Stored state
+        :param state: Scraped state
+        :param changed_at: Time of the transition (aware datetime)
+        """
+        self.node_type = node_type
+        self.uid = uid
+        self.key = key
+        self.previous = previous
+        self.state = state
+        self.changed_at = changed_at
+
+    def to_dict(self):
+        """
+        Convert the transition to a dictionary for Dgraph mutation.
+
+        :return: Dictionary setting the state of the node and adding a history node
+        """
+        history = {
+            'dgraph.type': 'StateChange',
+            'to_state': self.state,
+            'changed_at': self.changed_at.isoformat()
+        }
+        if self.previous is not None:
+            history['from_state'] = self.previous
+        return {'uid': self.uid, 'state': self.state, 'state_history': [history]}
+
+
+def object_key(obj):
+    """
+    Key identifying an object across loads and exports.
+
+    :param obj: Commission, Ministry, Deputy, Law, Question, SimilarLink or SourceFile object
+    :return: Key string
+    """
+    if isinstance(obj, (Question, SimilarLink, StateChange)):
+        return obj.key
+    if isinstance(obj, Law):
+        return law_key(obj.law_type, obj.link, obj.title)
+    if isinstance(obj, Deputy):
+        return normalize_name(obj.name)
+    if isinstance(obj, SourceFile):
+        return obj.path
+    return obj.name
+
+
+def stable_blank_node(obj):
+    """
+    Blank node ID of an object derived from its key, stable across exports.
+
+    :param obj: Commission, Ministry, Deputy, Law, Question or SourceFile object
+    :return: Blank node ID
+    """
+    return '_:%s.%s' % (type(obj).__name__.lower(), hashlib.sha1(object_key(obj).encode('utf-8')).hexdigest())
+
+
+def rdf_literal(value):
+    """
+    N-Quads literal of a scalar value.
+
+    :param value: String, number or boolean
+    :return: Escaped literal
+    """
+    if isinstance(value, bool):
+        return '"%s"^^<xs:boolean>' % str(value).lower()
+    if isinstance(value, int):
+        return '"%d"^^<xs:int>' % value
+    if isinstance(value, float):
+        return '"%r"^^<xs:float>' % value
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+    return '"%s"' % escaped
+
+
+def create_deputies(pol_manager,extraction,batch_size=DEFAULT_BATCH_SIZE,incremental=False):
+    """
+    Create the deputies of every changed term file, merging the terms of a
+    same deputy (through the deputy registry of the manager, or through an
+    upsert on the name in incremental mode).
+    """
+    deputies = {}
+    sources = []
+    for term in pol_manager.terms or TERMS :
+        path = DEPUTIES_PATH%term
+        content_hash = pol_manager.changed_source(path)
+        if content_hash is None :
+            continue
+        sources.append((path, content_hash))
+        pol_manager.begin_stream(path, content_hash)
+
+        for record in tqdm(extraction.read_deputies(term, path)):
+            key = normalize_name(record['name'])
+            deputy_g = deputies.get(key)
+            if deputy_g is None and not incremental :
+                deputy_g = pol_manager.deputies.get(record['name'])
+            if deputy_g is None :
+                deputy_g = Deputy(record['name'], record['party'])
+                if not incremental :
+                    pol_manager.deputies.add(deputy_g)
+            deputy_g.party = record['party']
+            deputies[key] = deputy_g
+
+            # Every term served gets a work_at node (counted by the tenure), even without a commission
+            commission = pol_manager.commission(record['commission']) if record['commission'] is not None else None
+            deputy_g.add_commission(commission,term)
+
+    # The deputies of every term file are merged, and sent as a single stream
+    stream = pol_manager.begin_stream('deputies', '+'.join(content_hash for _, content_hash in sources))
+    if incremental :
+        count = pol_manager.bulk_upsert(deputies.values(), upsert_deputy, batch_size, stream)
+        # Fetch the UIDs of the new deputies
+        pol_manager.deputies.load()
+    else :
+        count = pol_manager.bulk_create(deputies.values(), batch_size, stream=stream)
+
+    for path, content_hash in sources :
+        pol_manager.set_source_hash(path, content_hash)
+    return count
+
+def iter_laws(pol_manager,extraction,path=LAWS_PATH,analytics=None):
+    """
+    Yield the Law objects of the laws file, once per key: a law repeated in
+    the file (e.g. with another deposit date) keeps its first record, in the
+    full and incremental loads alike.
+    """
+    seen = set()
+    for record in tqdm(extraction.read_laws(path)):
+        key = law_key(record['type'], record['link'], record['title'])
+        if key in seen :
+            continue
+        seen.add(key)
+        commission = pol_manager.commission(record['commission'])
+        law = commission.create_law(record['title'], record['type'], record['link'])
+        # Deposit date of the first reading (None when the source gives none)
+        law.created_at = parse_date(record['date'])
+        law.update_state(record['state'])
+        if analytics :
+            analytics.add_law(path, law)
+        yield law
+
+def create_laws(pol_manager,extraction,batch_size=DEFAULT_BATCH_SIZE,incremental=False,analytics=None):
+    # The laws are not partitioned by term: a term-scoped load leaves them untouched
+    if pol_manager.terms is not None :
+        return 0
+    content_hash = pol_manager.changed_source(LAWS_PATH)
+    if content_hash is None :
+        return 0
+
+    laws = iter_laws(pol_manager, extraction, LAWS_PATH, analytics)
+    stream = pol_manager.begin_stream(LAWS_PATH, content_hash)
+    if incremental :
+        count = pol_manager.bulk_upsert(laws, upsert_law, batch_size, stream)
+    else :
+        count = pol_manager.bulk_create(laws, batch_size, stream=stream)
+    pol_manager.set_source_hash(LAWS_PATH, content_hash)
+    if analytics :
+        analytics.store(pol_manager, 'laws', LAWS_PATH)
+    return count
+
+def iter_questions(pol_manager,extraction,i,path,analytics=None,similar=None):
+    """Yield the Question objects of a file (of the loaded terms) whose author is resolved to a deputy."""
+    for record in tqdm(extraction.read_questions(i, path)) :
+        if pol_manager.terms is not None and record['term'] not in pol_manager.terms :
+            continue
+        deputy = pol_manager.authors.resolve(record['author'], record['term'])
+        if deputy is None :
+            continue
+
+        question = Question(record['title'],pol_manager.ministry(record['ministry']),record['state'])
+        question.author = deputy
+        question.key = question_key(record['title'], record['author'], record['date'])
+        question.term = record['term']
+        question.created_at = parse_date(record['date'])
+        if analytics :
+            analytics.add_question(path, question)
+        if similar is not None :
+            similar.add(question)
+        yield question
+
+def create_questions(pol_manager,extraction,batch_size=DEFAULT_BATCH_SIZE,incremental=False,analytics=None,similar=None):
+    # The similarity index records the UIDs of the questions as their batches are committed
+    pol_manager.similar = similar
+    try :
+        return _create_questions(pol_manager,extraction,batch_size,incremental,analytics,similar)
+    finally :
+        pol_manager.similar = None
+
+
+def _create_questions(pol_manager,extraction,batch_size,incremental,analytics,similar):
+    count = 0
+    pol_manager.authors.build(extraction)
+    for i in QUESTIONS_FILES:
+        path = QUESTIONS_PATH%i
+        content_hash = pol_manager.changed_source(path)
+        if content_hash is None :
+            continue
+
+        questions = iter_questions(pol_manager, extraction, i, path, analytics, similar)
+        stream = path if pol_manager.terms is None else term_source(path, '+'.join(pol_manager.terms))
+        pol_manager.begin_stream(stream, content_hash)
+        if incremental :
+            count += pol_manager.bulk_upsert(questions, upsert_question, batch_size, stream)
+        else :
+            count += pol_manager.bulk_create(
+                questions,
+                batch_size,
+                wrap=lambda question, q_dict: {'uid': question.author.uid, 'ask': q_dict},
+                stream=stream
+            )
+        # The hash of a file only loaded for some terms is not recorded
+        if pol_manager.terms is None :
+            pol_manager.set_source_hash(path, content_hash)
+        if analytics :
+            # The rows of every loaded term are replaced, None standing for the questions before the first term
+            for term in pol_manager.terms or [None] + TERMS :
+                analytics.store(pol_manager, 'questions', term_source(path, term))
+    return count
+
+
+def link_similar_questions(pol_manager,similar,batch_size=DEFAULT_BATCH_SIZE,incremental=False):
+    """
+    Link the near-duplicate questions of a load with similar_to edges.
+
+    :param pol_manager: DgraphPoliticalSystemManager (or RdfExporter) receiving the edges
+    :param similar: SimilarQuestions index filled while loading the questions
+    :param batch_size: Number of questions linked per batch
+    :param incremental: Find the questions by key with upserts instead of by UID
+    :return: Number of questions linked
+    """
+    # An incremental or term-scoped load is also compared with the stored questions sharing one of its bands
+    # (those of the other terms: dropping a term removed its similar_to edges to them)
+    if incremental or pol_manager.terms is not None :
+        for node in pol_manager.query_band_candidates(similar.band_keys()):
+            if node.get('key') and node.get('title') :
+                similar.add_stored(node['key'], node['uid'], node['title'])
+    links = similar.links()
+    if not incremental :
+        # A resumed load misses the UIDs of a batch committed just before the interruption
+        links = [link for link in links if link.resolved()]
+    # The links follow from the questions: their keys identify the stream
+    keys = hashlib.sha256('\n'.join(link.key for link in links).encode('utf-8')).hexdigest()
+    stream = pol_manager.begin_stream('similar_to', keys)
+    if incremental :
+        return pol_manager.bulk_upsert(links, upsert_similar, batch_size, stream)
+    return pol_manager.bulk_create(links, batch_size, stream=stream)
+
+
+class StateIndex:
+    """
+    Local index key -> (UIDs, state) of the stored questions and laws, kept
+    in a JSON file between two state syncs so that comparing the scraped
+    states does not read the whole graph. A key can have several nodes
+    (a record repeated in the sources is created once per occurrence by a
+    full load, and once by an incremental one).
+    """
+    def __init__(self, path=DEFAULT_STATE_INDEX):
+        """
+        :param path: Path of the JSON file
+        """
+        self.path = path
+        # node type -> {key: [[uid, ...], state]}
+        self.nodes = {'Question': {}, 'Law': {}}
+
+    def load(self):
+        """
+        Read the index file.
+
+        :return: Whether the file exists
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding='utf-8') as file:
+            self.nodes = json.load(file)
+        for nodes in self.nodes.values():
+            for entry in nodes.values():
+                # Index written with a single UID per key
+                if isinstance(entry[0], str):
+                    entry[0] = [entry[0]]
+        return True
+
+    def build(self, pol_manager):
+        """
+        Rebuild the index from the graph.
+
+        :param pol_manager: DgraphPoliticalSystemManager to read from
+        """
+        self.nodes = {'Question': {}, 'Law': {}}
+        for node_type, key, uid, state in pol_manager.query_states():
+            entry = self.nodes[node_type].setdefault(key, [[], state])
+            entry[0].append(uid)
+            entry[1] = state
+
+    def save(self):
+        """Write the index file."""
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump(self.nodes, file, ensure_ascii=False)
+
+    def clear(self):
+        """Delete the index file (a load changed the graph behind it)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def get(self, node_type, key):
+        """UIDs and state of the nodes of a key, or None."""
+        return self.nodes[node_type].get(key)
+
+    def set_state(self, node_type, key, state):
+        self.nodes[node_type][key][1] = state
+
+
+def scraped_states(extraction):
+    """
+    Read the states of the scraped laws and questions.
+
+    :param extraction: Extraction reading the sources
+    :return: Iterator of (node type, key, state, source of its analytics rows)
+    """
+    for record in tqdm(extraction.read_laws(LAWS_PATH)):
+        yield 'Law', law_key(record['type'], record['link'], record['title']), record['state'], LAWS_PATH
+    for i in QUESTIONS_FILES:
+        path = QUESTIONS_PATH%i
+        for record in tqdm(extraction.read_questions(i, path)):
+            yield ('Question', question_key(record['title'], record['author'], record['date']), record['state'],
+                   term_source(path, record['term']))
+
+
+def refresh_question_stats(pol_manager, sources):
+    """
+    Recompute the analytics rows of the questions of some sources (file and
+    term, see analytics.term_source) from the scraped files, as a load would.
+
+    :param pol_manager: DgraphPoliticalSystemManager storing the Stat nodes
+    :param sources: Set of the sources to refresh
+    """
+    extraction = Extraction()
+    extraction.run(laws=False, questions=False)
+    pol_manager.deputies.load()
+    pol_manager.load_entities()
+    pol_manager.authors.build(extraction)
+    for i in QUESTIONS_FILES:
+        path = QUESTIONS_PATH%i
+        terms = [term for term in [None] + TERMS if term_source(path, term) in sources]
+        if not terms :
+            continue
+        analytics = Analytics()
+        for _ in iter_questions(pol_manager, extraction, i, path, analytics):
+            pass
+        for term in terms :
+            analytics.store(pol_manager, 'questions', term_source(path, term))
+
+
+def sync_states(pol_manager,index,batch_size=DEFAULT_BATCH_SIZE,changed_at=None):
+    """
+    Refresh the states of the stored questions and laws from the sources:
+    the scraped states are compared with the local index, and only the
+    changed nodes are sent, each with a StateChange history node. Every
+    node of a changed key is updated, and the analytics rows of the
+    questions of the changed files and terms are recomputed.
+
+    :param pol_manager: DgraphPoliticalSystemManager
+    :param index: StateIndex (rebuilt from the graph when its file is missing, e.g. after a load)
+    :param batch_size: Number of changed nodes sent per mutation
+    :param changed_at: Time of the transitions (now by default)
+    :return: Counter of 'unchanged', 'changed' and 'unknown' (not loaded yet) keys
+    """
+    changed_at = changed_at or datetime.datetime.now(datetime.timezone.utc)
+    # The same node can appear several times in the sources: the last state wins
+    states, sources = {}, {}
+    for node_type, key, state, source in scraped_states(Extraction()):
+        states[node_type, key] = state
+        sources[node_type, key] = source
+    if not index.load():
+        index.build(pol_manager)
+
+    counts = collections.Counter()
+    changes = []
+    for (node_type, key), state in states.items():
+        stored = index.get(node_type, key)
+        if stored is None:
+            counts['unknown'] += 1
+        elif state is None or stored[1] == state:
+            counts['unchanged'] += 1
+        else:
+            counts['changed'] += 1
+            changes.extend(StateChange(node_type, uid, key, stored[1], state, changed_at) for uid in stored[0])
+
+    pol_manager.bulk_create(changes, batch_size)
+    for change in changes:
+        index.set_state(change.node_type, change.key, change.state)
+    index.save()
+    # The question rows of the analytics are keyed on the state (the law rows are not)
+    changed_sources = {sources[change.node_type, change.key] for change in changes if change.node_type == 'Question'}
+    if changed_sources:
+        refresh_question_stats(pol_manager, changed_sources)
+    return counts
+
+
+def ingest(pol_manager,batch_size=DEFAULT_BATCH_SIZE,incremental=False,analytics=None):
+    """
+    Run the loaders over every source.
+
+    :param pol_manager: DgraphPoliticalSystemManager (or RdfExporter) receiving the objects
+    :param batch_size: Number of nodes sent per batch
+    :param incremental: Upsert the changed nodes instead of creating them
+    :param analytics: Optional Analytics materialized for the loaded files
+    :return: Extraction holding the entities seen in the sources
+    """
+    # Every source is read once, the extraction collects the entities on the way
+    extraction = Extraction()
 
     ## Create Deputies
-    create_deputies(pol_manager,dict_commissions)
+    with pol_manager.phase('deputies') as phase:
+        phase['records'] = create_deputies(pol_manager,extraction,batch_size,incremental)
     
     ### Create laws in the commission
-    create_laws(pol_manager,dict_commissions)
+    with pol_manager.phase('laws') as phase:
+        phase['records'] = create_laws(pol_manager,extraction,batch_size,incremental,analytics)
 
     ## Create questions
-    create_questions(pol_manager,dict_ministry)
+    similar = SimilarQuestions()
+    with pol_manager.phase('questions') as phase:
+        phase['records'] = create_questions(pol_manager,extraction,batch_size,incremental,analytics,similar)
+
+    ## Link the near-duplicate questions
+    with pol_manager.phase('similarity') as phase:
+        phase['records'] = link_similar_questions(pol_manager,similar,batch_size,incremental)
+
+    ## Materialize the analytics depending on the whole graph
+    if analytics :
+        with pol_manager.phase('analytics'):
+            analytics.store_tenure(pol_manager)
+
+    return extraction
+
+
+def export(output_dir, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Export the scraped data as N-Quads and schema files for `dgraph bulk` / `dgraph live`,
+    without any Dgraph server.
+
+    :param output_dir: Output directory
+    :param batch_size: Number of nodes written per batch
+    :return: RdfExporter used for the export
+    """
+    exporter = RdfExporter(output_dir)
+    try:
+        ingest(exporter, batch_size)
+    finally:
+        exporter.close()
+    return exporter
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load the scraped parliament data into Dgraph.')
+    parser.add_argument('command', nargs='?', default='load', choices=['load', 'export', 'snapshot', 'mirror', 'states'],
+                        help='load the data into Dgraph, export it as RDF for dgraph bulk/live, save a sparse matrix '
+                             'snapshot of the loaded graph, rebuild the SQLite mirror from it, or only refresh the '
+                             'states of the loaded questions and laws (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='number of nodes sent per mutation (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='keep the existing data and only upsert the new or changed nodes of the changed files')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of batches sent concurrently, each worker getting its own gRPC stub (default: %(default)s)')
+    parser.add_argument('--alpha', action='append', metavar='HOST:PORT',
+                        help='Dgraph Alpha to connect to, repeated for several Alphas whose reads are load-balanced '
+                             '(default: localhost:9080)')
+    parser.add_argument('--routing', default=ROUND_ROBIN, choices=POLICIES,
+                        help='routing of the read-only queries over the Alphas (default: %(default)s)')
+    parser.add_argument('--output',
+                        help='output directory of the export and snapshot commands (default: export, snapshot)')
+    parser.add_argument('--term', action='append', dest='terms', choices=TERMS,
+                        help='only (re)load this term, repeated for several terms: its questions and commission '
+                             'memberships are dropped and loaded again, the other terms are left untouched')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted load from its last committed batch, instead of starting over')
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL,
+                        help='checkpoint journal of the load, used by --resume (default: %(default)s)')
+    parser.add_argument('--mirror', metavar='PATH',
+                        help='keep a local SQLite mirror of the graph in this file, updated after each load '
+                             '(default for the mirror command: %s)' % DEFAULT_MIRROR)
+    parser.add_argument('--states', default=DEFAULT_STATE_INDEX, metavar='PATH',
+                        help='local index of the stored states used by the states command, invalidated by the loads '
+                             '(default: %(default)s)')
+    parser.add_argument('--report',
+                        help='write a JSON report of the phases, call latencies, bytes sent and retries to this file')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='write a cProfile dump of each phase to this directory (and the report to DIR/report.json)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'export':
+        exporter = export(args.output or 'export', args.batch_size)
+        print('%d N-Quads written to %s (schema: %s)' % (exporter.quads, exporter.rdf_path, exporter.schema_path))
+        return
+
+    if args.command == 'snapshot':
+        # numpy and scipy are only needed by this command
+        from snapshot import GraphSnapshot
+        connection = DgraphConnection(endpoints=args.alpha, policy=args.routing)
+        graph = GraphSnapshot.build(DgraphPoliticalSystemManager(connection))
+        graph.save(args.output or 'snapshot')
+        print('Snapshot written to %s: %s' % (args.output or 'snapshot', ', '.join(
+            '%s %dx%d' % (name, *matrix.shape) for name, matrix in graph.matrices.items())))
+        connection.close()
+        return
+
+    if args.command == 'mirror':
+        connection = DgraphConnection(endpoints=args.alpha, policy=args.routing)
+        mirror = SqliteMirror(args.mirror or DEFAULT_MIRROR)
+        mirror.rebuild(DgraphPoliticalSystemManager(connection))
+        mirror.close()
+        connection.close()
+        print('Mirror written to %s' % (args.mirror or DEFAULT_MIRROR))
+        return
+
+    if args.command == 'states':
+        connection = DgraphConnection(endpoints=args.alpha, policy=args.routing)
+        pol_manager = DgraphPoliticalSystemManager(connection)
+        if args.mirror:
+            pol_manager.mirror = SqliteMirror(args.mirror)
+        counts = sync_states(pol_manager, StateIndex(args.states), args.batch_size)
+        if pol_manager.mirror:
+            pol_manager.mirror.sync(pol_manager)
+            pol_manager.mirror.close()
+        connection.close()
+        print('%(changed)d states changed, %(unchanged)d unchanged, %(unknown)d not loaded' % counts)
+        return
+
+    # Create Dgraph connection
+    connection = DgraphConnection(stubs=args.workers, endpoints=args.alpha, policy=args.routing)
+    instrumentation = None
+    if args.report or args.profile:
+        instrumentation = Instrumentation(args.profile)
+        connection.instrument(instrumentation)
+
+    # Create political system manager
+    pol_manager = DgraphPoliticalSystemManager(connection, args.workers, instrumentation=instrumentation)
+    pol_manager.terms = args.terms
+
+    # Checkpoint every committed batch, so that an interrupted load can be resumed
+    pol_manager.journal = Journal(args.journal)
+    resume = args.resume and pol_manager.journal.exists()
+    if args.resume and not resume:
+        print('No journal found at %s, starting a new load' % args.journal)
+    batch_size = pol_manager.journal.open(args.batch_size, resume)
+
+    with pol_manager.phase('setup'):
+        # Drop all existing data, or the data of the loaded terms (unless loading incrementally or resuming),
+        # and set schema
+        reload = not args.incremental and not resume
+        if reload and not args.terms:
+            connection.drop_all()
+        connection.set_schema()
+        if not resume:
+            # Checkpoints left by an interrupted load would make this one skip its batches
+            pol_manager.clear_checkpoints()
+        if reload and args.terms:
+            for term in args.terms:
+                pol_manager.drop_term(term, batch_size)
+        if resume:
+            pol_manager.load_checkpoints()
+
+        pol_manager.deputies.load()
+        pol_manager.load_source_hashes()
+
+        # Commissions and ministries are created on the fly, when first referenced
+        pol_manager.load_entities()
+
+        if args.mirror:
+            pol_manager.mirror = SqliteMirror(args.mirror)
+            if reload and not args.terms:
+                pol_manager.mirror.reset()
+            elif pol_manager.mirror.is_empty():
+                # The mirror starts with a copy of the data already loaded
+                pol_manager.mirror.rebuild(pol_manager)
+            elif reload:
+                for term in args.terms:
+                    pol_manager.mirror.drop_term(term)
+
+    ingest(pol_manager,batch_size,args.incremental,Analytics())
+    # The stored states changed behind the local index of the states command
+    StateIndex(args.states).clear()
+
+    if pol_manager.mirror:
+        with pol_manager.phase('mirror'):
+            pol_manager.mirror.sync(pol_manager)
+        pol_manager.mirror.close()
+
+    # The load completed: its checkpoints are not needed anymore
+    pol_manager.clear_checkpoints()
+    pol_manager.journal.close(remove=True)
+
+    if instrumentation:
+        instrumentation.write_report(args.report or os.path.join(args.profile, 'report.json'))
 
 
     ## Query representatives
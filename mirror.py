@@ -0,0 +1,450 @@
+"""
+Local SQLite mirror of the graph, for point lookups served in-process
+(and while the Alphas are down for a reload).
+
+The entities are keyed on their natural keys (names, law and question keys),
+so the loaders can record them as they send them, before Dgraph assigns
+their UIDs; the missing UIDs are looked up once the load is done:
+
+    pol_manager.mirror = SqliteMirror('mirror.sqlite')
+    ingest(pol_manager)
+    pol_manager.mirror.sync(pol_manager)
+    pol_manager.mirror.laws_by_commission('الخارجية')
+
+The read methods return the same dictionaries as the query methods of
+DgraphPoliticalSystemManager.
+"""
+import json
+import sqlite3
+import threading
+
+# Default path of the mirror
+DEFAULT_MIRROR = 'mirror.sqlite'
+# Number of keys looked up per request when filling the UIDs
+UID_LOOKUP_SIZE = 500
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS commissions (name TEXT PRIMARY KEY, uid TEXT);
+    CREATE TABLE IF NOT EXISTS ministries (name TEXT PRIMARY KEY, uid TEXT);
+    CREATE TABLE IF NOT EXISTS deputies (name TEXT PRIMARY KEY, uid TEXT, party TEXT);
+    -- One work_at edge per deputy and term, as in Dgraph
+    CREATE TABLE IF NOT EXISTS work_at (
+        deputy TEXT NOT NULL,
+        term TEXT NOT NULL,
+        commission TEXT,
+        PRIMARY KEY (deputy, term)
+    );
+    CREATE INDEX IF NOT EXISTS work_at_term ON work_at (term, commission);
+    -- developed_by is the commission column
+    CREATE TABLE IF NOT EXISTS laws (
+        key TEXT PRIMARY KEY,
+        uid TEXT,
+        title TEXT,
+        type TEXT,
+        link TEXT,
+        created_at TEXT,
+        commission TEXT
+    );
+    CREATE INDEX IF NOT EXISTS laws_commission ON laws (commission, title);
+    -- to is the ministry column, ask the author column
+    CREATE TABLE IF NOT EXISTS questions (
+        key TEXT PRIMARY KEY,
+        uid TEXT,
+        title TEXT,
+        state TEXT,
+        created_at TEXT,
+        ministry TEXT,
+        author TEXT,
+        term TEXT
+    );
+    CREATE INDEX IF NOT EXISTS questions_ministry ON questions (ministry, created_at);
+    CREATE INDEX IF NOT EXISTS questions_term ON questions (term, created_at);
+    CREATE INDEX IF NOT EXISTS questions_author ON questions (author);
+"""
+
+TABLES = ['commissions', 'ministries', 'deputies', 'work_at', 'laws', 'questions']
+
+
+def law_key(law_type, link, title):
+    """Stable key identifying a law (several laws can share a link), stored on its key predicate."""
+    return '%s|%s|%s' % (law_type, link, title)
+
+
+def compact(**fields):
+    """Dictionary of the fields that are set (Dgraph leaves the missing predicates out)."""
+    return {name: value for name, value in fields.items() if value is not None and value != []}
+
+
+class SqliteMirror:
+    """Mirror of the deputies, commissions, ministries, laws and questions in an indexed SQLite file."""
+    def __init__(self, path=DEFAULT_MIRROR):
+        """
+        Open (or create) a mirror.
+
+        :param path: Path of the SQLite file
+        """
+        self.path = path
+        # The batches are recorded from the worker threads of the loaders
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'questions'").fetchone() and \
+                'term' not in [column[1] for column in self.db.execute('PRAGMA table_info(questions)')]:
+            # Mirror written before the questions kept their term: filled by the next rebuild
+            self.db.execute('ALTER TABLE questions ADD COLUMN term TEXT')
+        self.db.executescript(SCHEMA)
+
+    def is_empty(self):
+        return self.db.execute('SELECT NOT EXISTS (SELECT 1 FROM deputies)').fetchone()[0] == 1
+
+    def reset(self):
+        """Delete every row (before a full load)."""
+        with self.lock:
+            for table in TABLES:
+                self.db.execute('DELETE FROM %s' % table)
+            self.db.commit()
+
+    def _entity(self, table, entity):
+        if entity is not None:
+            self.db.execute('INSERT INTO %s (name, uid) VALUES (?, ?) '
+                            'ON CONFLICT (name) DO UPDATE SET uid = coalesce(excluded.uid, uid)' % table,
+                            (entity.name, entity.uid))
+
+    def _deputy(self, deputy):
+        self.db.execute('INSERT INTO deputies (name, uid, party) VALUES (?, ?, ?) '
+                        'ON CONFLICT (name) DO UPDATE SET uid = coalesce(excluded.uid, uid), '
+                        'party = coalesce(excluded.party, party)',
+                        (deputy.name, deputy.uid, deputy.party))
+
+    def add_deputy(self, deputy):
+        """
+        Record a deputy sent by the loaders, with its work_at edges (committed by sync).
+
+        :param deputy: Deputy object
+        """
+        with self.lock:
+            self._deputy(deputy)
+            for commission, term in zip(deputy.commissions, deputy.terms):
+                self._entity('commissions', commission)
+                self.db.execute('INSERT OR REPLACE INTO work_at (deputy, term, commission) VALUES (?, ?, ?)',
+                                (deputy.name, term, commission.name if commission else None))
+
+    def add_law(self, law):
+        """
+        Record a law sent by the loaders, with its developed_by edge (committed by sync).
+
+        :param law: Law object
+        """
+        with self.lock:
+            self._entity('commissions', law.commission)
+            self.db.execute(
+                'INSERT INTO laws (key, uid, title, type, link, created_at, commission) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'uid = coalesce(excluded.uid, uid), created_at = excluded.created_at, commission = excluded.commission',
+                (law_key(law.law_type, law.link, law.title), law.uid, law.title, law.law_type, law.link,
+                 law.created_at.isoformat() if law.created_at else None,
+                 law.commission.name if law.commission else None))
+
+    def add_question(self, question):
+        """
+        Record a question sent by the loaders, with its to and ask edges (committed by sync).
+
+        :param question: Question object
+        """
+        with self.lock:
+            self._entity('ministries', question.ministry)
+            if question.author is not None:
+                self._deputy(question.author)
+            self.db.execute(
+                'INSERT INTO questions (key, uid, title, state, created_at, ministry, author, term) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'uid = coalesce(excluded.uid, uid), title = excluded.title, state = excluded.state, '
+                'created_at = excluded.created_at, ministry = excluded.ministry, author = excluded.author, '
+                'term = excluded.term',
+                (question.key, question.uid, question.title, question.state,
+                 question.created_at.isoformat() if question.created_at else None,
+                 question.ministry.name if question.ministry else None,
+                 question.author.name if question.author else None,
+                 question.term))
+
+    def drop_term(self, term):
+        """
+        Delete the work_at edges and questions of a term, and the deputies
+        left without any term or question (as DgraphPoliticalSystemManager.drop_term).
+
+        :param term: Term to drop
+        """
+        with self.lock:
+            self.db.execute('DELETE FROM questions WHERE term = ?', (term,))
+            self.db.execute('DELETE FROM deputies WHERE name IN (SELECT deputy FROM work_at WHERE term = ?) '
+                            'AND name NOT IN (SELECT deputy FROM work_at WHERE term != ?) '
+                            'AND name NOT IN (SELECT author FROM questions WHERE author IS NOT NULL)', (term, term))
+            self.db.execute('DELETE FROM work_at WHERE term = ?', (term,))
+            self.db.commit()
+
+    def set_question_state(self, key, state):
+        """
+        Record the new state of a question (committed by sync).
+
+        :param key: Key of the question
+        :param state: New state
+        """
+        with self.lock:
+            self.db.execute('UPDATE questions SET state = ? WHERE key = ?', (state, key))
+
+    def sync(self, pol_manager):
+        """
+        Complete the rows recorded during a load with the UIDs Dgraph assigned
+        (the upserts do not return them), and commit them.
+
+        :param pol_manager: DgraphPoliticalSystemManager of the load
+        :return: Number of UIDs filled
+        """
+        filled = 0
+        for table, column, predicate, node_type in [('deputies', 'name', 'name', 'Deputy'),
+                                                    ('commissions', 'name', 'name', 'Commission'),
+                                                    ('ministries', 'name', 'name', 'Ministry'),
+                                                    ('questions', 'key', 'key', 'Question'),
+                                                    ('laws', 'key', 'key', 'Law')]:
+            with self.lock:
+                values = [row[0] for row in self.db.execute(
+                    'SELECT DISTINCT %s FROM %s WHERE uid IS NULL AND %s IS NOT NULL' % (column, table, column))]
+            for i in range(0, len(values), UID_LOOKUP_SIZE):
+                uids = lookup_uids(pol_manager, predicate, node_type, values[i:i + UID_LOOKUP_SIZE])
+                with self.lock:
+                    self.db.executemany('UPDATE %s SET uid = ? WHERE %s = ? AND uid IS NULL' % (table, column),
+                                        [(uid, value) for value, uid in uids.items()])
+                filled += len(uids)
+        with self.lock:
+            self.db.commit()
+        return filled
+
+    def rebuild(self, pol_manager, page_size=1000):
+        """
+        Copy the whole graph, through cursors (see DgraphPoliticalSystemManager.paginate).
+
+        :param pol_manager: DgraphPoliticalSystemManager to read from
+        :param page_size: Number of nodes fetched per request
+        """
+        self.reset()
+        query = """{
+            page(func: type(Deputy), %(page)s) {
+                uid
+                name
+                party
+                work_at { term commission { uid name } }
+            }
+        }"""
+        with self.lock:
+            for node in pol_manager.paginate(query, page_size=page_size):
+                self.db.execute('INSERT OR REPLACE INTO deputies (name, uid, party) VALUES (?, ?, ?)',
+                                (node.get('name'), node['uid'], node.get('party')))
+                for work_at in node.get('work_at', []):
+                    commission = work_at.get('commission', {})
+                    if commission:
+                        self.db.execute('INSERT OR REPLACE INTO commissions (name, uid) VALUES (?, ?)',
+                                        (commission.get('name'), commission['uid']))
+                    self.db.execute('INSERT OR REPLACE INTO work_at (deputy, term, commission) VALUES (?, ?, ?)',
+                                    (node.get('name'), work_at.get('term'), commission.get('name')))
+
+        query = """{
+            page(func: type(Law), %(page)s) {
+                uid
+                title
+                type
+                link
+                key
+                created_at
+                developed_by { uid name }
+            }
+        }"""
+        with self.lock:
+            for node in pol_manager.paginate(query, page_size=page_size):
+                commission = node.get('developed_by', {})
+                if commission:
+                    self.db.execute('INSERT OR REPLACE INTO commissions (name, uid) VALUES (?, ?)',
+                                    (commission.get('name'), commission['uid']))
+                self.db.execute('INSERT OR REPLACE INTO laws (key, uid, title, type, link, created_at, commission) '
+                                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                (node.get('key') or law_key(node.get('type'), node.get('link'), node.get('title')),
+                                 node['uid'],
+                                 node.get('title'), node.get('type'), node.get('link'),
+                                 node.get('created_at'), commission.get('name')))
+
+        query = """{
+            page(func: type(Question), %(page)s) {
+                uid
+                title
+                state
+                key
+                created_at
+                term
+                to { uid name }
+                ~ask { uid name party }
+            }
+        }"""
+        with self.lock:
+            for node in pol_manager.paginate(query, page_size=page_size):
+                ministry = node.get('to', {})
+                if ministry:
+                    self.db.execute('INSERT OR REPLACE INTO ministries (name, uid) VALUES (?, ?)',
+                                    (ministry.get('name'), ministry['uid']))
+                author = (node.get('~ask') or [{}])[0]
+                self.db.execute('INSERT OR REPLACE INTO questions (key, uid, title, state, created_at, ministry, author, '
+                                'term) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (node.get('key') or node['uid'], node['uid'], node.get('title'), node.get('state'),
+                                 node.get('created_at'), ministry.get('name'), author.get('name'), node.get('term')))
+            self.db.commit()
+
+    # Read API, with the shape of the query methods of DgraphPoliticalSystemManager
+
+    def query_representative(self, name, rep_type=None):
+        """
+        Look a representative up by name (only the deputies are mirrored).
+
+        :param name: Name of the representative
+        :param rep_type: Type of representative (Deputy or Minister)
+        :return: List of matching representatives
+        """
+        if rep_type not in (None, 'Deputy'):
+            return []
+        rows = self.db.execute('SELECT uid, name, party FROM deputies WHERE name = ?', (name,)).fetchall()
+        if not rows:
+            return []
+        uid, name, party = rows[0]
+        work_at = [compact(commission=compact(uid=commission_uid, name=commission), term=term)
+                   for term, commission, commission_uid in self.db.execute(
+                       'SELECT w.term, w.commission, c.uid FROM work_at w LEFT JOIN commissions c '
+                       'ON c.name = w.commission WHERE w.deputy = ? ORDER BY w.term', (name,))]
+        ask = [compact(to=compact(uid=ministry_uid, name=ministry) if ministry else None, title=title)
+               for title, ministry, ministry_uid in self.db.execute(
+                   'SELECT q.title, q.ministry, m.uid FROM questions q LEFT JOIN ministries m '
+                   'ON m.name = q.ministry WHERE q.author = ?', (name,))]
+        return [compact(uid=uid, name=name, party=party, work_at=work_at, ask=ask)]
+
+    def query_representatives(self, names, rep_type=None):
+        """
+        Look several representatives up by name.
+
+        :param names: Names of the representatives
+        :param rep_type: Type of representative (Deputy or Minister)
+        :return: Dictionary name -> list of matching representatives
+        """
+        return {name: self.query_representative(name, rep_type) for name in dict.fromkeys(names)}
+
+    def query_deputies(self):
+        """
+        Query the uid, name and party of all the deputies.
+
+        :return: List of deputies
+        """
+        return [compact(uid=uid, name=name, party=party)
+                for uid, name, party in self.db.execute('SELECT uid, name, party FROM deputies')]
+
+    def laws_by_commission(self, commission):
+        """
+        Query the laws developed by a commission.
+
+        :param commission: Name of the commission
+        :return: List of laws, by title
+        """
+        return [compact(uid=uid, title=title, type=law_type, link=link, created_at=created_at)
+                for uid, title, law_type, link, created_at in self.db.execute(
+                    'SELECT uid, title, type, link, created_at FROM laws WHERE commission = ? ORDER BY title',
+                    (commission,))]
+
+    def questions_to_ministry(self, ministry):
+        """
+        Query the questions addressed to a ministry.
+
+        :param ministry: Name of the ministry
+        :return: List of questions, oldest first
+        """
+        return [compact(uid=uid, title=title, state=state, created_at=created_at,
+                        **{'~ask': [compact(name=author, party=party)] if author else None})
+                for uid, title, state, created_at, author, party in self.db.execute(
+                    'SELECT q.uid, q.title, q.state, q.created_at, q.author, d.party FROM questions q '
+                    'LEFT JOIN deputies d ON d.name = q.author WHERE q.ministry = ? ORDER BY q.created_at',
+                    (ministry,))]
+
+    def deputies_in_term(self, term, commission=None):
+        """
+        Query the deputies of a term.
+
+        :param term: Term, e.g. '2016_2021'
+        :param commission: Optional name of a commission the deputies worked at during the term
+        :return: List of deputies with their commission during the term, by name
+        """
+        query = ('SELECT d.uid, d.name, d.party, w.commission, c.uid FROM work_at w '
+                 'JOIN deputies d ON d.name = w.deputy LEFT JOIN commissions c ON c.name = w.commission '
+                 'WHERE w.term = ?')
+        parameters = [term]
+        if commission is not None:
+            query += ' AND w.commission = ?'
+            parameters.append(commission)
+        return [compact(uid=uid, name=name, party=party, work_at=[
+                    compact(term=term, commission=compact(uid=commission_uid, name=commission_name)
+                            if commission_name else None)])
+                for uid, name, party, commission_name, commission_uid in self.db.execute(
+                    query + ' ORDER BY d.name', parameters)]
+
+    def questions_in_term(self, term, ministry=None):
+        """
+        Query the questions asked during a term.
+
+        :param term: Term, e.g. '2021_2026'
+        :param ministry: Optional name of the ministry the questions are addressed to
+        :return: List of questions, oldest first
+        """
+        query = ('SELECT q.uid, q.title, q.state, q.created_at, q.ministry, q.author, d.party FROM questions q '
+                 'LEFT JOIN deputies d ON d.name = q.author WHERE q.term = ?')
+        parameters = [term]
+        if ministry is not None:
+            query += ' AND q.ministry = ?'
+            parameters.append(ministry)
+        return [compact(uid=uid, title=title, state=state, created_at=created_at,
+                        to=compact(name=ministry_name) if ministry_name else None,
+                        **{'~ask': [compact(name=author, party=party)] if author else None})
+                for uid, title, state, created_at, ministry_name, author, party in self.db.execute(
+                    query + ' ORDER BY q.created_at', parameters)]
+
+    def deputies_with_n_terms(self, n):
+        """
+        Query the deputies who served exactly n terms.
+
+        :param n: Number of terms
+        :return: List of deputies with their terms, by name
+        """
+        rows = self.db.execute(
+            'SELECT d.uid, d.name, d.party, w.term, w.commission FROM deputies d JOIN work_at w ON w.deputy = d.name '
+            'WHERE d.name IN (SELECT deputy FROM work_at GROUP BY deputy HAVING count(*) = ?) '
+            'ORDER BY d.name, w.term', (n,))
+        deputies = {}
+        for uid, name, party, term, commission in rows:
+            deputy = deputies.setdefault(name, compact(uid=uid, name=name, party=party, work_at=None))
+            deputy.setdefault('work_at', []).append(
+                compact(term=term, commission=compact(name=commission) if commission else None))
+        return list(deputies.values())
+
+    def close(self):
+        self.db.close()
+
+
+def lookup_uids(pol_manager, predicate, node_type, values):
+    """
+    Look the UIDs of nodes up by an indexed predicate, in a single request
+    with one query block per value.
+
+    :param pol_manager: DgraphPoliticalSystemManager
+    :param predicate: Indexed predicate (name or key)
+    :param node_type: Type of the nodes
+    :param values: Values of the predicate
+    :return: Dictionary value -> UID of the values found
+    """
+    query = 'query uids(%s) {\n%s\n}' % (
+        ', '.join('$v%d: string' % i for i in range(len(values))),
+        '\n'.join('v%d(func: eq(%s, $v%d)) @filter(type(%s)) { uid }' % (i, predicate, i, node_type)
+                  for i in range(len(values))))
+    response = pol_manager.connection.reads.query(query, {'$v%d' % i: value for i, value in enumerate(values)})
+    result = json.loads(response.json)
+    return {value: result['v%d' % i][0]['uid'] for i, value in enumerate(values) if result.get('v%d' % i)}
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the index-driven queries of DgraphPoliticalSystemManager
+against the example queries of query_examples.txt they replace, which scan
+every node with has(...) and @cascade. Runs against a loaded Dgraph:
+
+    python3 query_benchmark.py --alpha localhost:9080 --runs 20
+"""
+import argparse
+import json
+import statistics
+import time
+
+import main
+
+# The example queries, before the reverse edges and count indexes
+BEFORE = {
+    'laws_by_commission': """query laws($commission: string) {
+        q(func: has(developed_by)) @cascade {
+            title
+            developed_by @filter(eq(name, $commission)) {
+                name
+            }
+        }
+    }""",
+    'questions_to_ministry': """query questions($ministry: string) {
+        q(func: has(ask)) @cascade {
+            name
+            party
+            ask @cascade {
+                to @filter(eq(name, $ministry)) {
+                    name
+                }
+                title
+            }
+        }
+    }""",
+    'deputies_in_term': """query deputies($term: string) {
+        q(func: has(name)) @cascade {
+            uid
+            name
+            party
+            work_at @filter(eq(term, $term)) {
+                commission {
+                    uid
+                    name
+                }
+                uid
+                term
+            }
+        }
+    }""",
+    'deputies_with_n_terms': """query deputies($n: int) {
+        q(func: has(name)) @filter(eq(count(work_at), $n)) {
+            name
+            party
+            work_at {
+                commission {
+                    name
+                }
+                term
+            }
+            count(work_at)
+        }
+    }""",
+}
+
+
+def before_count(name, result):
+    """Number of laws/questions/deputies found by an example query."""
+    if name == 'questions_to_ministry':
+        return sum(len(deputy.get('ask', [])) for deputy in result['q'])
+    return len(result['q'])
+
+
+def timed(func, runs):
+    """Median latency (in milliseconds) of a call, and its last result."""
+    latencies = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), result
+
+
+def run(pol_manager, commission, ministry, term, n, runs):
+    """
+    Time every query before and after, bypassing the cache.
+
+    :return: List of results, one per query
+    """
+    def uncached(func, *args):
+        def call():
+            pol_manager.cache.invalidate()
+            return func(*args)
+        return call
+
+    cases = [
+        ('laws_by_commission', {'$commission': commission}, pol_manager.laws_by_commission, (commission,)),
+        ('questions_to_ministry', {'$ministry': ministry}, pol_manager.questions_to_ministry, (ministry,)),
+        ('deputies_in_term', {'$term': term}, pol_manager.deputies_in_term, (term,)),
+        ('deputies_with_n_terms', {'$n': str(n)}, pol_manager.deputies_with_n_terms, (n,)),
+    ]
+    results = []
+    for name, variables, method, args in cases:
+        before_ms, before = timed(uncached(pol_manager.query, BEFORE[name], variables), runs)
+        after_ms, after = timed(uncached(method, *args), runs)
+        results.append({'query': name, 'before_ms': before_ms, 'after_ms': after_ms,
+                        'before_results': before_count(name, before), 'after_results': len(after)})
+    return results
+
+
+def report(results):
+    print('%-22s %12s %12s %9s %9s %9s' % ('query', 'before (ms)', 'after (ms)', 'speedup', 'before #', 'after #'))
+    for r in results:
+        print('%-22s %12.2f %12.2f %8.1fx %9d %9d' % (
+            r['query'], r['before_ms'], r['after_ms'], r['before_ms'] / r['after_ms'] if r['after_ms'] else 0.0,
+            r['before_results'], r['after_results']))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the index-driven queries against the example queries.')
+    parser.add_argument('--alpha', action='append', metavar='HOST:PORT',
+                        help='Dgraph Alpha to query, repeated for several Alphas (default: localhost:9080)')
+    parser.add_argument('--runs', type=int, default=10,
+                        help='number of runs of each query, the median is reported (default: %(default)s)')
+    parser.add_argument('--commission', default='الخارجية', help='commission of laws_by_commission')
+    parser.add_argument('--ministry', default='التجهيز والماء', help='ministry of questions_to_ministry')
+    parser.add_argument('--term', default='2016_2021', help='term of deputies_in_term')
+    parser.add_argument('--terms', type=int, default=3, help='number of terms of deputies_with_n_terms')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def benchmark_main(argv=None):
+    args = parse_args(argv)
+    connection = main.DgraphConnection(endpoints=args.alpha)
+    try:
+        results = run(main.DgraphPoliticalSystemManager(connection),
+                      args.commission, args.ministry, args.term, args.terms, args.runs)
+    finally:
+        connection.close()
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    benchmark_main()
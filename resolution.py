@@ -0,0 +1,165 @@
+from collections import Counter, defaultdict
+
+from check_data import name_key, normalize_name
+
+# Length of the character n-grams of the blocking index
+NGRAM = 3
+# Minimum Jaccard similarity between the n-grams of an author and of a deputy
+MIN_SIMILARITY = 0.6
+
+
+def name_ngrams(key):
+    """
+    Character n-grams of a name key, spaces removed (so that 'اد موسى' and
+    'ادموسى' share all their n-grams) and padded to weigh the ends of the name.
+
+    :param key: Name key (see check_data.name_key)
+    :return: Set of n-grams
+    """
+    compact = '#%s#' % key.replace(' ', '')
+    return frozenset(compact[i:i + NGRAM] for i in range(len(compact) - NGRAM + 1))
+
+
+class Candidate:
+    """Deputy indexed by the resolver."""
+    __slots__ = ('deputy', 'ngrams', 'terms', 'party')
+
+    def __init__(self, deputy, terms, party):
+        self.deputy = deputy
+        self.ngrams = name_ngrams(name_key(deputy.name))
+        self.terms = set(terms)
+        self.party = party
+
+    def serves(self, term):
+        """Whether the deputy served during a term (unknown terms do not rule a deputy out)."""
+        return not self.terms or term is None or term in self.terms
+
+
+class AuthorResolver:
+    """
+    Matches the authors of the questions to the deputies, through their
+    spelling variants (spaces, tatweel, hamza and alef forms...).
+
+    An author is first looked up by exact name, then by name key, then among
+    the deputies sharing character n-grams with it (blocking index), so that
+    only a handful of deputies are compared to each author. Candidates are
+    disambiguated by the term of the question (and the party when the source
+    gives one), and an author matching several deputies equally well is left
+    unresolved. Resolutions are cached per (author, term).
+    """
+    def __init__(self, registry):
+        """
+        Initialize an empty resolver.
+
+        :param registry: DeputyRegistry holding the deputies
+        """
+        self.registry = registry
+        self.candidates = {}
+        self.by_key = defaultdict(list)
+        self.index = defaultdict(list)
+        self.resolved = {}
+        self.stats = Counter()
+
+    def build(self, extraction=None):
+        """
+        Index the deputies of the registry.
+
+        :param extraction: Optional Extraction giving the terms and parties of the deputies read from the sources
+        """
+        self.candidates.clear()
+        self.by_key.clear()
+        self.index.clear()
+        self.resolved.clear()
+        known = extraction.deputies if extraction is not None else {}
+        for deputy in self.registry:
+            entry = known.get(normalize_name(deputy.name), {})
+            candidate = Candidate(deputy, entry.get('terms') or deputy.terms,
+                                  entry.get('party', deputy.party))
+            self.candidates[id(deputy)] = candidate
+            self.by_key[name_key(deputy.name).replace(' ', '')].append(candidate)
+            for ngram in candidate.ngrams:
+                self.index[ngram].append(candidate)
+
+    def resolve(self, author, term=None, party=None):
+        """
+        Find the deputy who wrote a question.
+
+        :param author: Author of the question
+        :param term: Term of the question
+        :param party: Party of the author, when known
+        :return: Deputy object or None
+        """
+        cache_key = (author, term, party)
+        if cache_key in self.resolved:
+            return self.resolved[cache_key]
+
+        deputy = self.registry.get(author)
+        if deputy is not None:
+            kind = 'exact'
+            same = self.by_key.get(name_key(author).replace(' ', ''), [])
+            exact = self.candidates.get(id(deputy))
+            # Several deputies share the name: the exact one must also fit the term (and party)
+            if len(same) > 1 and exact is not None and not (
+                    exact.serves(term) and (party is None or exact.party == party)):
+                deputy = self._disambiguate(same, term, party, strict=True)
+                kind = 'variant' if deputy is not None else 'ambiguous'
+        else:
+            deputy, kind = self._match(author, term, party)
+        self.stats[kind] += 1
+        self.resolved[cache_key] = deputy
+        return deputy
+
+    def _match(self, author, term, party):
+        key = name_key(author)
+        if not key:
+            return None, 'unmatched'
+
+        # Same key: a spelling variant of the name, accepted even outside the term
+        same = self._disambiguate(self.by_key.get(key.replace(' ', ''), []), term, party, strict=False)
+        if same is not None:
+            return same, 'variant'
+
+        ngrams = name_ngrams(key)
+        shared = Counter()
+        for ngram in ngrams:
+            for candidate in self.index.get(ngram, ()):
+                shared[id(candidate.deputy)] += 1
+        scored = []
+        for deputy_id, count in shared.items():
+            candidate = self.candidates[deputy_id]
+            similarity = count / (len(ngrams) + len(candidate.ngrams) - count)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, candidate))
+        if not scored:
+            return None, 'unmatched'
+
+        best = max(similarity for similarity, _ in scored)
+        deputy = self._disambiguate([candidate for similarity, candidate in scored if similarity == best],
+                                    term, party, strict=True)
+        return deputy, 'fuzzy' if deputy is not None else 'ambiguous'
+
+    @staticmethod
+    def _disambiguate(candidates, term, party, strict):
+        """
+        Pick the single candidate serving in the term (and of the party, when given).
+
+        :param strict: Reject the candidates who did not serve in the term, even if there is only one
+        """
+        if not candidates:
+            return None
+        serving = [candidate for candidate in candidates if candidate.serves(term)]
+        if party is not None and len(serving) > 1:
+            serving = [candidate for candidate in serving if candidate.party == party] or serving
+        if len(serving) == 1:
+            return serving[0].deputy
+        if not serving and not strict and len(candidates) == 1:
+            return candidates[0].deputy
+        return None
+
+    def mapping(self):
+        """
+        Resolved authors.
+
+        :return: Dictionary author -> UID of the deputy
+        """
+        return {author: deputy.uid for (author, _, _), deputy in self.resolved.items() if deputy is not None}
@@ -0,0 +1,230 @@
+import itertools
+import threading
+import time
+
+import grpc
+import pydgraph
+
+# Read routing policies
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+POLICIES = [ROUND_ROBIN, LEAST_LOADED]
+
+# Seconds between two health checks of the Alphas
+DEFAULT_HEALTH_INTERVAL = 10.0
+# Timeout (in seconds) of a health check
+HEALTH_TIMEOUT = 2.0
+# Weight of the last latency in the moving average of an Alpha
+LATENCY_SMOOTHING = 0.2
+
+# gRPC errors meaning the Alpha is unreachable, rather than the query being wrong
+FAILOVER_CODES = {grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED}
+
+
+def is_unreachable(error):
+    """Whether an error of a request means that its Alpha is unreachable."""
+    return isinstance(error, grpc.RpcError) and callable(getattr(error, 'code', None)) \
+        and error.code() in FAILOVER_CODES
+
+
+class Endpoint:
+    """An Alpha, with its own pool of gRPC stubs and its load."""
+    def __init__(self, address, client, stubs=()):
+        """
+        :param address: host:port of the Alpha
+        :param client: Client sending the requests to this Alpha only
+        :param stubs: gRPC stubs of the client (closed with the endpoint)
+        """
+        self.address = address
+        self.client = client
+        self.stubs = list(stubs)
+        self.healthy = True
+        self.in_flight = 0
+        self.latency = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.version = None
+
+    @classmethod
+    def connect(cls, address, stubs=1):
+        """
+        Open a pool of stubs to an Alpha.
+
+        :param address: host:port of the Alpha
+        :param stubs: Number of gRPC stubs (channels) of the pool
+        :return: Endpoint
+        """
+        client_stubs = [pydgraph.DgraphClientStub(address) for _ in range(max(1, stubs))]
+        return cls(address, pydgraph.DgraphClient(*client_stubs), client_stubs)
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'healthy': self.healthy,
+            'in_flight': self.in_flight,
+            'mean_latency_ms': self.latency * 1000,
+            'requests': self.requests,
+            'failures': self.failures,
+            'version': self.version
+        }
+
+
+class ReadRouter:
+    """
+    Spreads the read-only queries over several Alphas.
+
+    Each query goes to a healthy Alpha chosen round-robin, or to the one with
+    the fewest requests in flight (then the lowest mean latency). An Alpha
+    that cannot be reached is marked down and the query fails over to the
+    next one; a background thread checks every Alpha periodically and brings
+    them back once they answer again.
+
+        router = ReadRouter([Endpoint.connect('alpha1:9080'), Endpoint.connect('alpha2:9080')])
+        result = router.query('{ q(func: has(name)) { name } }', best_effort=True)
+    """
+    def __init__(self, endpoints, policy=ROUND_ROBIN, health_interval=DEFAULT_HEALTH_INTERVAL):
+        """
+        Initialize a router.
+
+        :param endpoints: List of Endpoint objects
+        :param policy: ROUND_ROBIN or LEAST_LOADED
+        :param health_interval: Seconds between two health checks (0 disables the background checks)
+        """
+        if policy not in POLICIES:
+            raise ValueError('Unknown routing policy %r (expected one of %s)' % (policy, ', '.join(POLICIES)))
+        if not endpoints:
+            raise ValueError('At least one endpoint is needed')
+        self.endpoints = endpoints
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.turns = itertools.count()
+        self.stopped = threading.Event()
+        self.monitor = None
+        if health_interval and len(endpoints) > 1:
+            self.monitor = threading.Thread(target=self._monitor, args=(health_interval,), daemon=True)
+            self.monitor.start()
+
+    def candidates(self):
+        """
+        Endpoints to try for a request, best first: the healthy ones in policy
+        order, then the ones marked down (they may have come back).
+
+        :return: List of Endpoint objects
+        """
+        with self.lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            down = [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+            if self.policy == LEAST_LOADED:
+                healthy.sort(key=lambda endpoint: (endpoint.in_flight, endpoint.latency))
+            elif healthy:
+                turn = next(self.turns) % len(healthy)
+                healthy = healthy[turn:] + healthy[:turn]
+        return healthy + down
+
+    def acquire(self, endpoint):
+        with self.lock:
+            endpoint.in_flight += 1
+
+    def release(self, endpoint, seconds=None, error=None):
+        """
+        Account for a finished request.
+
+        :param endpoint: Endpoint the request was sent to
+        :param seconds: Latency of the request, if it succeeded
+        :param error: Exception raised by the request
+        """
+        with self.lock:
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            if error is not None and is_unreachable(error):
+                endpoint.failures += 1
+                if endpoint.healthy:
+                    endpoint.healthy = False
+                    print(f"Alpha {endpoint.address} unreachable, failing over: {error}")
+            elif seconds is not None:
+                endpoint.healthy = True
+                endpoint.latency = seconds if not endpoint.latency else \
+                    LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * endpoint.latency
+
+    def query(self, query, variables=None, best_effort=False):
+        """
+        Run a read-only query, failing over to the other Alphas when one is unreachable.
+
+        :param query: Query text
+        :param variables: Optional query variables
+        :param best_effort: Read from the local state of the Alpha, without
+                            waiting for it to catch up with the latest commits
+        :return: Response of the query
+        """
+        error = None
+        for endpoint in self.candidates():
+            self.acquire(endpoint)
+            start = time.perf_counter()
+            try:
+                txn = endpoint.client.txn(read_only=True, best_effort=best_effort)
+                response = txn.query(query, variables=variables)
+            except Exception as e:
+                self.release(endpoint, error=e)
+                if not is_unreachable(e):
+                    raise
+                error = e
+                continue
+            self.release(endpoint, time.perf_counter() - start)
+            return response
+        print(f"No Alpha reachable: {error}")
+        raise error
+
+    def txn(self, best_effort=False):
+        """
+        Open a read-only transaction on a healthy Alpha, for several queries
+        that must read the same snapshot (no failover once it is open).
+
+        :param best_effort: Best-effort transaction
+        :return: Transaction
+        """
+        return self.candidates()[0].client.txn(read_only=True, best_effort=best_effort)
+
+    def check(self, timeout=HEALTH_TIMEOUT):
+        """
+        Check every Alpha, marking it up or down.
+
+        :param timeout: Timeout of each check
+        :return: List of the statistics of the endpoints
+        """
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                version = endpoint.client.check_version(timeout=timeout)
+            except Exception as e:
+                with self.lock:
+                    endpoint.failures += 1
+                    if endpoint.healthy:
+                        endpoint.healthy = False
+                        print(f"Alpha {endpoint.address} failed its health check: {e}")
+                continue
+            with self.lock:
+                if not endpoint.healthy:
+                    print(f"Alpha {endpoint.address} is back")
+                endpoint.healthy = True
+                endpoint.version = version
+                seconds = time.perf_counter() - start
+                endpoint.latency = seconds if not endpoint.latency else \
+                    LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * endpoint.latency
+        return self.stats()
+
+    def _monitor(self, interval):
+        while not self.stopped.wait(interval):
+            self.check()
+
+    def stats(self):
+        with self.lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def close(self):
+        """Stop the health checks and close the stubs of every endpoint."""
+        self.stopped.set()
+        if self.monitor is not None:
+            self.monitor.join()
+        for endpoint in self.endpoints:
+            for stub in endpoint.stubs:
+                stub.close()
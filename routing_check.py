@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Check of the read routing of routing.py against in-process stand-ins for
+the Alphas (benchmark.FakeDgraphClient), without any server: the queries
+fail over from an unreachable Alpha, and the health checks bring it back.
+
+    python3 routing_check.py
+"""
+import sys
+import time
+
+import grpc
+
+from benchmark import FakeDgraphClient, FakeTxn
+from routing import POLICIES, ROUND_ROBIN, Endpoint, ReadRouter
+
+QUERY = '{ q(func: has(name)) { name } }'
+
+
+class UnavailableError(grpc.RpcError):
+    """Error of a request to an Alpha that cannot be reached."""
+    def code(self):
+        return grpc.StatusCode.UNAVAILABLE
+
+    def __str__(self):
+        return 'unavailable'
+
+
+class FakeAlphaTxn(FakeTxn):
+    def query(self, query, variables=None, **kwargs):
+        if self.client.down:
+            raise UnavailableError()
+        return super().query(query, variables, **kwargs)
+
+
+class FakeAlpha(FakeDgraphClient):
+    """Fake client of one Alpha, which can be taken down and up again."""
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def txn(self, read_only=False, best_effort=False, **kwargs):
+        return FakeAlphaTxn(self, read_only, best_effort)
+
+    def check_version(self, timeout=None):
+        if self.down:
+            raise UnavailableError()
+        return 'fake'
+
+
+def served(alphas):
+    """Number of queries answered by each Alpha."""
+    return [alpha.counters['queries'] for alpha in alphas]
+
+
+def check_policy(policy, queries=6):
+    """
+    Take an Alpha down and up again under a routing policy.
+
+    :param policy: ROUND_ROBIN or LEAST_LOADED
+    :param queries: Number of queries sent at each step
+    :return: List of the failed checks
+    """
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append('%s: %s' % (policy, message))
+
+    alphas = [FakeAlpha(), FakeAlpha()]
+    endpoints = [Endpoint('alpha%d:9080' % i, alpha) for i, alpha in enumerate(alphas, 1)]
+    router = ReadRouter(endpoints, policy, health_interval=0)
+
+    alphas[0].down = True
+    for _ in range(queries):
+        router.query(QUERY)
+    check(served(alphas) == [0, queries], 'queries answered %s while alpha1 is down' % served(alphas))
+    check(not endpoints[0].healthy, 'alpha1 not marked down')
+
+    alphas[0].down = False
+    router.check()
+    check(endpoints[0].healthy, 'alpha1 not marked up by the health check')
+    before = served(alphas)
+    for _ in range(queries):
+        router.query(QUERY)
+    if policy == ROUND_ROBIN:
+        check(served(alphas)[0] > before[0], 'alpha1 gets no query once back up')
+
+    for alpha in alphas:
+        alpha.down = True
+    try:
+        router.query(QUERY)
+        check(False, 'no error with every Alpha down')
+    except UnavailableError:
+        pass
+    router.close()
+    return failures
+
+
+def check_monitor(interval=0.05, timeout=2.0):
+    """
+    Bring an Alpha back with the background health checks.
+
+    :return: List of the failed checks
+    """
+    alphas = [FakeAlpha(), FakeAlpha()]
+    endpoints = [Endpoint('alpha%d:9080' % i, alpha) for i, alpha in enumerate(alphas, 1)]
+    router = ReadRouter(endpoints, health_interval=interval)
+    try:
+        alphas[0].down = True
+        router.query(QUERY)
+        router.query(QUERY)
+        if endpoints[0].healthy:
+            return ['monitor: alpha1 not marked down']
+        alphas[0].down = False
+        deadline = time.monotonic() + timeout
+        while not endpoints[0].healthy and time.monotonic() < deadline:
+            time.sleep(interval)
+        return [] if endpoints[0].healthy else ['monitor: alpha1 not marked up within %.1fs' % timeout]
+    finally:
+        router.close()
+
+
+def routing_check_main():
+    failures = []
+    for policy in POLICIES:
+        failures.extend(check_policy(policy))
+    failures.extend(check_monitor())
+    for failure in failures:
+        print('FAILED %s' % failure)
+    print('%d routing checks failed' % len(failures) if failures else 'Routing checks passed')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(routing_check_main())
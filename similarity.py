@@ -0,0 +1,203 @@
+import functools
+import random
+import zlib
+from collections import defaultdict
+
+from check_data import title_terms
+
+# MinHash signatures are cut into BANDS bands of ROWS values: two titles
+# sharing a band are candidates (about 60% of Jaccard similarity and above)
+BANDS = 8
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+# Estimated Jaccard similarity above which two titles are near-duplicates
+SIMILARITY_THRESHOLD = 0.8
+
+MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed: the band keys are stored in the database and must not change between runs
+_rng = random.Random(0x5eed)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(title):
+    """
+    Shingles of a title: its search terms, so that diacritics, letter
+    variants, stop words and affixes do not count.
+
+    :param title: Title of a question
+    :return: Set of shingles
+    """
+    return set(title_terms(title))
+
+
+@functools.lru_cache(maxsize=1 << 17)
+def permuted_hashes(shingle):
+    """Hashes of a shingle under every permutation (memoized, the vocabulary of the titles is small)."""
+    h = zlib.crc32(shingle.encode('utf-8'))
+    return tuple((a * h + b) % MERSENNE_PRIME for a, b in PERMUTATIONS)
+
+
+@functools.lru_cache(maxsize=1 << 14)
+def signature(title):
+    """
+    MinHash signature of a title (memoized, it is needed by the mutation and by the index).
+
+    :param title: Title of a question
+    :return: Tuple of NUM_PERM minimum hashes, or None for a title without words
+    """
+    values = [permuted_hashes(shingle) for shingle in shingles(title)]
+    if not values:
+        return None
+    return tuple(map(min, zip(*values)))
+
+
+@functools.lru_cache(maxsize=1 << 14)
+def bands(sig):
+    """
+    LSH band keys of a signature ('<band>:<hash of its rows>').
+
+    :param sig: MinHash signature
+    :return: Tuple of BANDS strings
+    """
+    return tuple('%d:%08x' % (band, zlib.crc32(repr(sig[band * ROWS:(band + 1) * ROWS]).encode('ascii')))
+                 for band in range(BANDS))
+
+
+def similarity(sig, other):
+    """Jaccard similarity estimated from two signatures."""
+    return sum(1 for a, b in zip(sig, other) if a == b) / NUM_PERM
+
+
+class SimilarQuestions:
+    """
+    LSH index of the questions of a load, finding the near-duplicate titles
+    without comparing every pair: only the questions sharing a band bucket
+    are compared.
+
+    Only the keys and signatures of the questions are kept, so that the
+    index stays small while the questions are streamed; their UIDs are
+    recorded as their batches are committed (see record). The stored
+    questions sharing a band with the load can be added (see add_stored)
+    so that the load is also compared with them.
+    """
+    def __init__(self):
+        self.signatures = {}
+        self.uids = {}
+        self.buckets = defaultdict(list)
+        self.stored = set()
+
+    def add(self, question):
+        """
+        Index a question (once per key).
+
+        :param question: Question object, with its key
+        """
+        if question.key in self.signatures:
+            return
+        sig = signature(question.title)
+        if sig is None:
+            return
+        self.signatures[question.key] = sig
+        for band in bands(sig):
+            self.buckets[band].append(question.key)
+
+    def add_stored(self, key, uid, title):
+        """
+        Index a question already in the database, which is only compared
+        with the questions of the load (their pairs are already linked).
+
+        :param key: Key of the question
+        :param uid: UID of the question
+        :param title: Title of the question
+        """
+        if key in self.signatures:
+            return
+        sig = signature(title)
+        if sig is None:
+            return
+        self.signatures[key] = sig
+        self.uids[key] = uid
+        self.stored.add(key)
+        for band in bands(sig):
+            self.buckets[band].append(key)
+
+    def band_keys(self):
+        """Band keys of the indexed questions."""
+        return list(self.buckets)
+
+    def record(self, questions):
+        """
+        Record the UIDs of committed questions (the first one of each key).
+
+        :param questions: Objects of a committed batch
+        """
+        for question in questions:
+            if question.uid and getattr(question, 'key', None) in self.signatures:
+                self.uids.setdefault(question.key, question.uid)
+
+    def pairs(self):
+        """
+        Near-duplicate pairs of questions.
+
+        :return: Iterator of (key, key, estimated similarity)
+        """
+        seen = set()
+        for keys in self.buckets.values():
+            for i, key in enumerate(keys):
+                for other in keys[i + 1:]:
+                    pair = (key, other) if key < other else (other, key)
+                    if pair in seen or (key in self.stored and other in self.stored):
+                        continue
+                    seen.add(pair)
+                    score = similarity(self.signatures[key], self.signatures[other])
+                    if score >= SIMILARITY_THRESHOLD:
+                        yield pair[0], pair[1], score
+
+    def links(self):
+        """
+        Group the pairs by question.
+
+        :return: List of SimilarLink objects
+        """
+        similar = defaultdict(list)
+        for key, other, _ in self.pairs():
+            similar[key].append(other)
+        return [SimilarLink(key, others, self.uids) for key, others in similar.items()]
+
+    def __len__(self):
+        return len(self.signatures) - len(self.stored)
+
+
+class SimilarLink:
+    """similar_to edges from a question to its near-duplicates."""
+    __slots__ = ('key', 'similar', 'uids')
+
+    def __init__(self, key, similar, uids):
+        """
+        :param key: Key of the question
+        :param similar: List of the keys of the questions similar to it
+        :param uids: Dictionary key -> UID of the committed questions
+        """
+        self.key = key
+        self.similar = similar
+        self.uids = uids
+
+    @property
+    def uid(self):
+        return self.uids.get(self.key)
+
+    @uid.setter
+    def uid(self, uid):
+        self.uids[self.key] = uid
+
+    def resolved(self):
+        """Whether the question and all its near-duplicates have a UID."""
+        return self.uid is not None and all(other in self.uids for other in self.similar)
+
+    def to_dict(self, compact=True):
+        """
+        Convert the links to a dictionary for Dgraph mutation.
+
+        :return: Dictionary with the uid of the question and its similar_to edges
+        """
+        return {'uid': self.uid, 'similar_to': [{'uid': self.uids[other]} for other in self.similar]}
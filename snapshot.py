@@ -0,0 +1,255 @@
+"""
+Sparse matrix snapshot of the graph, for offline network analytics.
+
+The edges are stored as integer-indexed CSR matrices, and the nodes as
+arrays of UIDs and names, in .npy files that can be memory-mapped:
+
+    snapshot = GraphSnapshot.build(pol_manager)
+    snapshot.save('snapshot')
+    snapshot = GraphSnapshot.load('snapshot')
+    shared = snapshot.co_membership('2016_2021')
+
+Requires numpy and scipy (pip install numpy scipy).
+"""
+import json
+import os
+from array import array
+
+import numpy as np
+import scipy.sparse as sp
+
+from check_data import TERMS
+
+# Node sets: name -> predicate labelling the nodes
+NODES = {
+    'deputies': 'name',
+    'commissions': 'name',
+    'ministries': 'name',
+    'laws': 'title',
+    'questions': 'title',
+}
+
+# Matrices: name -> (row nodes, column nodes)
+MATRICES = dict(
+    [('work_at', ('deputies', 'commissions'))]
+    + [('work_at_%s' % term, ('deputies', 'commissions')) for term in TERMS]
+    + [('ask', ('deputies', 'questions')),
+       ('to', ('questions', 'ministries')),
+       ('developed_by', ('laws', 'commissions'))]
+)
+
+MANIFEST = 'snapshot.json'
+
+
+class NodeIndex:
+    """Dense integer ids of the nodes of a set, in order of appearance."""
+    def __init__(self):
+        self.ids = {}
+        self.uids = []
+        self.labels = []
+        self.parties = []
+
+    def add(self, uid, label=None, party=None):
+        """
+        Get the id of a node, registering it on first sight.
+
+        :param uid: UID of the node
+        :param label: Name or title of the node
+        :param party: Party of a deputy
+        :return: Integer id
+        """
+        index = self.ids.get(uid)
+        if index is None:
+            index = self.ids[uid] = len(self.uids)
+            self.uids.append(uid)
+            self.labels.append(label or '')
+            self.parties.append(party or '')
+        elif label and not self.labels[index]:
+            self.labels[index] = label
+        return index
+
+
+class EdgeList:
+    """Edges accumulated as compact integer arrays before building a matrix."""
+    def __init__(self):
+        self.rows = array('i')
+        self.cols = array('i')
+
+    def add(self, row, col):
+        self.rows.append(row)
+        self.cols.append(col)
+
+    def to_csr(self, shape):
+        """CSR matrix counting the edges between each pair of nodes."""
+        data = np.ones(len(self.rows), dtype=np.int32)
+        matrix = sp.coo_matrix((data, (np.frombuffer(self.rows, dtype=np.int32),
+                                       np.frombuffer(self.cols, dtype=np.int32))), shape=shape)
+        return matrix.tocsr()
+
+
+class GraphSnapshot:
+    """CSR matrices of the edges of the graph, with the UIDs and labels of their nodes."""
+    def __init__(self, nodes, matrices):
+        """
+        :param nodes: Dictionary node set -> {'uid', 'label' (and 'party' for the deputies)} arrays
+        :param matrices: Dictionary name -> scipy.sparse.csr_matrix
+        """
+        self.nodes = nodes
+        self.matrices = matrices
+
+    @classmethod
+    def build(cls, pol_manager, page_size=1000):
+        """
+        Read the graph through cursors (see DgraphPoliticalSystemManager.paginate).
+
+        :param pol_manager: DgraphPoliticalSystemManager to read from
+        :param page_size: Number of nodes fetched per request
+        :return: GraphSnapshot
+        """
+        index = {name: NodeIndex() for name in NODES}
+        edges = {name: EdgeList() for name in MATRICES}
+
+        query = """{
+            page(func: type(Deputy), %(page)s) {
+                uid
+                name
+                party
+                work_at { term commission { uid name } }
+            }
+        }"""
+        for node in pol_manager.paginate(query, page_size=page_size):
+            deputy = index['deputies'].add(node['uid'], node.get('name'), node.get('party'))
+            for work_at in node.get('work_at', []):
+                if 'commission' not in work_at:
+                    continue
+                commission = index['commissions'].add(work_at['commission']['uid'], work_at['commission'].get('name'))
+                edges['work_at'].add(deputy, commission)
+                if 'work_at_%s' % work_at.get('term') in edges:
+                    edges['work_at_%s' % work_at['term']].add(deputy, commission)
+
+        query = """{
+            page(func: type(Question), %(page)s) {
+                uid
+                title
+                to { uid name }
+                ~ask { uid }
+            }
+        }"""
+        for node in pol_manager.paginate(query, page_size=page_size):
+            question = index['questions'].add(node['uid'], node.get('title'))
+            if 'to' in node:
+                edges['to'].add(question, index['ministries'].add(node['to']['uid'], node['to'].get('name')))
+            for author in node.get('~ask', []):
+                edges['ask'].add(index['deputies'].add(author['uid']), question)
+
+        query = """{
+            page(func: type(Law), %(page)s) {
+                uid
+                title
+                developed_by { uid name }
+            }
+        }"""
+        for node in pol_manager.paginate(query, page_size=page_size):
+            law = index['laws'].add(node['uid'], node.get('title'))
+            if 'developed_by' in node:
+                commission = node['developed_by']
+                edges['developed_by'].add(law, index['commissions'].add(commission['uid'], commission.get('name')))
+
+        nodes = {}
+        for name, node_index in index.items():
+            nodes[name] = {'uid': np.array(node_index.uids, dtype=str), 'label': np.array(node_index.labels, dtype=str)}
+            if name == 'deputies':
+                nodes[name]['party'] = np.array(node_index.parties, dtype=str)
+        matrices = {name: edge_list.to_csr((len(index[rows].uids), len(index[cols].uids)))
+                    for name, edge_list in edges.items()
+                    for rows, cols in [MATRICES[name]]}
+        return cls(nodes, matrices)
+
+    def save(self, directory):
+        """
+        Write the snapshot as .npy files plus a JSON manifest.
+
+        :param directory: Output directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {'nodes': {}, 'matrices': {}}
+        for name, arrays in self.nodes.items():
+            manifest['nodes'][name] = {'size': len(arrays['uid']), 'label': NODES[name], 'arrays': sorted(arrays)}
+            for field, values in arrays.items():
+                np.save(os.path.join(directory, '%s.%s.npy' % (name, field)), values)
+        for name, matrix in self.matrices.items():
+            rows, cols = MATRICES[name]
+            manifest['matrices'][name] = {'rows': rows, 'cols': cols, 'shape': list(matrix.shape), 'nnz': int(matrix.nnz)}
+            for field in ('data', 'indices', 'indptr'):
+                np.save(os.path.join(directory, '%s.%s.npy' % (name, field)), getattr(matrix, field))
+        with open(os.path.join(directory, MANIFEST), 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Read a snapshot written by save.
+
+        :param directory: Snapshot directory
+        :param mmap: Memory-map the arrays instead of reading them
+        :return: GraphSnapshot
+        """
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(directory, MANIFEST)) as file:
+            manifest = json.load(file)
+        nodes = {name: {field: np.load(os.path.join(directory, '%s.%s.npy' % (name, field)), mmap_mode=mmap_mode)
+                        for field in entry['arrays']}
+                 for name, entry in manifest['nodes'].items()}
+        matrices = {}
+        for name, entry in manifest['matrices'].items():
+            arrays = [np.load(os.path.join(directory, '%s.%s.npy' % (name, field)), mmap_mode=mmap_mode)
+                      for field in ('data', 'indices', 'indptr')]
+            matrices[name] = sp.csr_matrix(tuple(arrays), shape=tuple(entry['shape']), copy=False)
+        return cls(nodes, matrices)
+
+    def co_membership(self, term=None):
+        """
+        Number of commissions shared by each pair of deputies.
+
+        :param term: Optional term (all the terms by default)
+        :return: Symmetric deputies x deputies CSR matrix (the diagonal holds the memberships of each deputy)
+        """
+        work_at = self.matrices['work_at_%s' % term if term else 'work_at']
+        membership = (work_at > 0).astype(np.int32)
+        return (membership @ membership.T).tocsr()
+
+    def party_ministry(self):
+        """
+        Number of questions asked by the deputies of each party to each ministry.
+
+        :return: (parties array, parties x ministries dense matrix)
+        """
+        parties, party_ids = np.unique(self.nodes['deputies']['party'], return_inverse=True)
+        by_party = sp.csr_matrix((np.ones(len(party_ids), dtype=np.int32), (party_ids, np.arange(len(party_ids)))),
+                                 shape=(len(parties), len(party_ids)))
+        return parties, (by_party @ self.matrices['ask'] @ self.matrices['to']).toarray()
+
+    def centrality(self, term=None, iterations=100, tolerance=1e-9):
+        """
+        Eigenvector centrality of the deputies in the co-membership graph (power iteration).
+
+        :param term: Optional term
+        :param iterations: Maximum number of iterations
+        :param tolerance: Convergence threshold on the L1 change of the scores
+        :return: Array of scores, one per deputy (summing to 1)
+        """
+        adjacency = self.co_membership(term)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        scores = np.full(adjacency.shape[0], 1.0 / max(adjacency.shape[0], 1))
+        for _ in range(iterations):
+            # Adding the scores themselves keeps the iteration from oscillating on bipartite components
+            updated = adjacency @ scores + scores
+            total = updated.sum()
+            if total == 0:
+                return scores
+            updated /= total
+            if np.abs(updated - scores).sum() < tolerance:
+                return updated
+            scores = updated
+        return scores
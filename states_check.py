@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Check of the states command (main.sync_states) against an in-process
+stand-in for Dgraph (benchmark.FakeDgraphClient), without any server: an
+adopted text reaching its next stage keeps its key, and is recorded as a
+single StateChange instead of an unknown law.
+
+    python3 states_check.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+# The progress bars of the loaders would drown the report
+os.environ.setdefault('TQDM_DISABLE', '1')
+
+import main
+from benchmark import FakeDgraphClient
+from check_data import DEPUTIES_PATH, LAWS_PATH, QUESTIONS_FILES, QUESTIONS_PATH, TERMS, Extraction
+
+NEXT_STAGE = 'صادق عليه مجلس النواب - القراءة 2'
+
+
+class RecordingManager(main.DgraphPoliticalSystemManager):
+    """Manager keeping the objects it creates."""
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.created = []
+
+    def bulk_create(self, objects, batch_size=main.DEFAULT_BATCH_SIZE, wrap=None, stream=None):
+        objects = list(objects)
+        self.created.extend(objects)
+        return super().bulk_create(objects, batch_size, wrap, stream)
+
+
+def link_sources(root, cwd):
+    """Link the deputies and questions files of data/ into the corpus at root."""
+    os.makedirs(os.path.join(root, 'data'))
+    paths = [DEPUTIES_PATH % term for term in TERMS] + [QUESTIONS_PATH % i for i in QUESTIONS_FILES]
+    for path in paths:
+        os.symlink(os.path.join(cwd, path), os.path.join(root, path))
+
+
+def advance_stage(source, target):
+    """
+    Copy the laws file, moving the first adopted text at its first reading to the second one.
+
+    :return: Title of the advanced text, without its stage
+    """
+    with open(source, encoding='utf-8') as file:
+        laws = json.load(file)
+    for project in laws['textes_de_loi']:
+        stage, _, title = project['title'].partition('\n')
+        if stage.endswith('1'):
+            project['title'] = '%s\n%s' % (NEXT_STAGE, title)
+            break
+    with open(target, 'w', encoding='utf-8') as file:
+        json.dump(laws, file, ensure_ascii=False)
+    return title.strip()
+
+
+def check_stage_change(root):
+    """
+    Sync the states after an adopted text reached its next stage.
+
+    :return: List of the failed checks
+    """
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    # Index of the states as left by a load of the original files
+    index = main.StateIndex(os.path.join(root, main.DEFAULT_STATE_INDEX))
+    for i, (node_type, key, state, _) in enumerate(main.scraped_states(Extraction())):
+        index.nodes[node_type].setdefault(key, [['0x%x' % (i + 1)], state])[1] = state
+    index.save()
+
+    cwd = os.getcwd()
+    title = advance_stage(os.path.join(cwd, LAWS_PATH), os.path.join(root, LAWS_PATH))
+    os.chdir(root)
+    try:
+        pol_manager = RecordingManager(main.DgraphConnection(client=FakeDgraphClient()))
+        counts = main.sync_states(pol_manager, main.StateIndex(index.path))
+    finally:
+        os.chdir(cwd)
+
+    changes = [change for change in pol_manager.created if isinstance(change, main.StateChange)]
+    check(counts['changed'] == 1, '%d keys changed instead of 1' % counts['changed'])
+    check(counts['unknown'] == 0, '%d keys not loaded instead of 0' % counts['unknown'])
+    check(len(changes) == 1, '%d StateChange nodes instead of 1' % len(changes))
+    if changes:
+        change = changes[0]
+        check(change.node_type == 'Law' and change.key.endswith('|' + title), 'change of another node: %s' % change.key)
+        check(change.state == NEXT_STAGE, 'new state %r instead of %r' % (change.state, NEXT_STAGE))
+    return failures
+
+
+def states_check_main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        link_sources(root, cwd)
+        failures = check_stage_change(root)
+    for failure in failures:
+        print('FAILED %s' % failure)
+    print('%d state checks failed' % len(failures) if failures else 'State checks passed')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(states_check_main())